@@ -0,0 +1,102 @@
+"""
+Benchmarks of the quantify module on synthetic logs of 1, 5 and 20 user-years.
+
+Run offline with pytest-benchmark, runtime is tracked by pytest-benchmark and the peak memory allocated by a
+single call is reported in each benchmark's extra info:
+
+    $ pytest benchmarks --benchmark-columns=min,mean,max --benchmark-save=baseline
+    $ pytest benchmarks --benchmark-compare=0001_baseline --benchmark-compare-fail=mean:10%
+"""
+import tracemalloc
+
+import pytest
+
+from fasting import incremental
+from fasting import quantify
+from fasting import synthetic
+
+pytest.importorskip('pytest_benchmark')
+
+USER_YEARS = [1, 5, 20]
+
+
+@pytest.fixture(scope='module', params=USER_YEARS, ids=[f'{years}y' for years in USER_YEARS])
+def discrete(request):
+    return synthetic.discrete_log(years=request.param, seed=0)
+
+
+@pytest.fixture(scope='module')
+def export(discrete, tmp_path_factory):
+    path = tmp_path_factory.mktemp('exports') / 'export.csv'
+    synthetic.zero_export(discrete, seed=0).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def continuous(discrete):
+    return quantify.continuous_fasts(discrete)
+
+
+@pytest.fixture(scope='module')
+def timeline(discrete):
+    return quantify.continuous_fasts(discrete, compact=True)
+
+
+def run(benchmark, function, *args, **kwargs):
+    """Benchmark a function, recording the peak memory allocated by one call in MiB."""
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    benchmark.extra_info['peak_memory_mib'] = round(peak / 2 ** 20, 3)
+    return benchmark(function, *args, **kwargs)
+
+
+def test_zero_fasts(benchmark, export):
+    run(benchmark, quantify.zero_fasts, export)
+
+
+def test_validate_discrete_fasts(benchmark, discrete):
+    run(benchmark, quantify.validate_discrete_fasts, discrete)
+
+
+def test_continuous_fasts(benchmark, discrete):
+    run(benchmark, quantify.continuous_fasts, discrete, validate=False)
+
+
+def test_continuous_fasts_compact(benchmark, discrete):
+    run(benchmark, quantify.continuous_fasts, discrete, compact=True, validate=False)
+
+
+def test_validate_continuous_fasts(benchmark, continuous):
+    run(benchmark, quantify.validate_continuous_fasts, continuous)
+
+
+def test_consecutive_minutes(benchmark, continuous):
+    run(benchmark, quantify.consecutive_minutes, continuous, validate=False)
+
+
+def test_daily_cumulative_hours(benchmark, continuous):
+    run(benchmark, quantify.daily_cumulative_hours, continuous, validate=False)
+
+
+def test_daily_max_consecutive_hours(benchmark, continuous):
+    run(benchmark, quantify.daily_max_consecutive_hours, continuous, validate=False)
+
+
+def test_daily_cumulative_hours_timeline(benchmark, timeline):
+    run(benchmark, quantify.daily_cumulative_hours, timeline, validate=False)
+
+
+def test_daily_max_consecutive_hours_timeline(benchmark, timeline):
+    run(benchmark, quantify.daily_max_consecutive_hours, timeline, validate=False)
+
+
+def test_summary(benchmark, discrete):
+    run(benchmark, quantify.summary, discrete, validate=False)
+
+
+def test_windowed_daily_metrics(benchmark, discrete):
+    def windowed():
+        return list(incremental.windowed_daily_metrics(incremental.continuous_chunks(discrete, window='30D')))
+    run(benchmark, windowed)
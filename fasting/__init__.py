@@ -1,5 +1,20 @@
 """Top-level package for fasting."""
+import importlib
 
 __author__ = """Joe Pauly"""
 __email__ = 'joseph.b.pauly@gmail.com'
 __version__ = '0.1.0'
+
+# Submodules are imported on first access, e.g. fasting.quantify, so importing the package does not import pandas
+_SUBMODULES = ['backends', 'cache', 'cli', 'cohort', 'incremental', 'profiling', 'quantify', 'query', 'storage',
+               'synthetic', 'timeline']
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + _SUBMODULES)
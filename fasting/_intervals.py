@@ -0,0 +1,276 @@
+"""Interval arithmetic on discrete fasts, used to derive continuous log statistics without building the log."""
+import numpy as np
+
+NANOSECONDS_PER_MINUTE = 60 * 10 ** 9
+NANOSECONDS_PER_DAY = 24 * 60 * NANOSECONDS_PER_MINUTE
+
+
+def grid_runs(starts: np.ndarray, ends: np.ndarray, origin: int, step: int = NANOSECONDS_PER_MINUTE):
+    """
+    Convert fasts into runs of fasting time steps on a regular grid anchored at origin.
+    A time step is fasting if its timestamp falls within a fast, start and end inclusive,
+    the same rule used to build a continuous log. Overlapping, touching and back to back fasts
+    (no non-fasting time step in between) are merged into a single run.
+
+    Args:
+        starts: Fast start datetimes as int64 nanoseconds, sorted ascending.
+        ends: Fast end datetimes as int64 nanoseconds, in the same order as starts.
+        origin: Timestamp of the first time step as int64 nanoseconds.
+        step: Length of a time step in nanoseconds.
+
+    Returns: Tuple of int64 arrays (run_starts, run_ends) with the first and last time step position of each run.
+    """
+    first = -((origin - starts) // step)  # Ceiling: first time step on or after the start
+    last = (ends - origin) // step  # Floor: last time step on or before the end
+    return merge_runs(first, last)
+
+
+def merge_runs(first: np.ndarray, last: np.ndarray):
+    """
+    Merge overlapping, touching and back to back runs of time steps.
+
+    Args:
+        first: First time step position of each run, sorted ascending.
+        last: Last time step position of each run. Runs with last before first are empty and dropped.
+
+    Returns: Tuple of int64 arrays (run_starts, run_ends) of the merged runs.
+    """
+    keep = first <= last  # Fasts shorter than a step may not contain any time step
+    first, last = first[keep], last[keep]
+    if not len(first):
+        return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+
+    # A new run begins when a fast starts after every previous fast ended plus one time step
+    previous_last = np.maximum.accumulate(last)
+    new_run = np.ones(len(first), dtype=bool)
+    new_run[1:] = first[1:] > previous_last[:-1] + 1
+    run_starts = first[new_run]
+    run_ends = np.maximum.reduceat(last, np.flatnonzero(new_run))
+    return run_starts, run_ends
+
+
+def daily_runs(run_starts: np.ndarray, run_ends: np.ndarray, origin: int, periods: int,
+               step: int = NANOSECONDS_PER_MINUTE):
+    """
+    Split runs of fasting time steps at midnight and aggregate them by day.
+    Days span from the day of the first time step to the day of the last time step, the same days
+    a daily resample of the continuous log would return.
+    A run can start before the first time step (negative position), carrying consecutive time steps
+    over from before the log; only its time steps from the first time step on are counted as fasted.
+
+    Args:
+        run_starts: First time step position of each run, as returned by grid_runs().
+        run_ends: Last time step position of each run, as returned by grid_runs().
+        origin: Timestamp of the first time step as int64 nanoseconds.
+        periods: Number of time steps in the continuous log.
+        step: Length of a time step in nanoseconds.
+
+    Returns: Tuple (first_day, cumulative_steps, max_consecutive_steps)
+                - first_day: Midnight of the first day as int64 nanoseconds.
+                - cumulative_steps: int64 array of fasting time steps per day.
+                - max_consecutive_steps: int64 array of the longest run per day,
+                  including time steps carried over from previous days.
+    """
+    first_day = origin - origin % NANOSECONDS_PER_DAY
+    n_days = (origin + (periods - 1) * step - first_day) // NANOSECONDS_PER_DAY + 1
+    cumulative_steps = np.zeros(n_days, dtype='int64')
+    max_consecutive_steps = np.zeros(n_days, dtype='int64')
+    if not len(run_starts):
+        return first_day, cumulative_steps, max_consecutive_steps
+
+    # Last time step position of each day
+    midnights = first_day + np.arange(1, n_days + 1, dtype='int64') * NANOSECONDS_PER_DAY
+    day_last = (midnights - 1 - origin) // step
+    day_first = np.concatenate([[0], day_last[:-1] + 1])
+
+    # One piece per run per day it spans
+    run_first_day = (origin + np.maximum(run_starts, 0) * step - first_day) // NANOSECONDS_PER_DAY
+    run_last_day = (origin + run_ends * step - first_day) // NANOSECONDS_PER_DAY
+    pieces_per_run = run_last_day - run_first_day + 1
+    run = np.repeat(np.arange(len(run_starts)), pieces_per_run)
+    offsets = np.arange(len(run)) - np.repeat(np.cumsum(pieces_per_run) - pieces_per_run, pieces_per_run)
+    day = run_first_day[run] + offsets
+    piece_first = np.maximum(run_starts[run], day_first[day])
+    piece_last = np.minimum(run_ends[run], day_last[day])
+
+    np.add.at(cumulative_steps, day, piece_last - piece_first + 1)
+    np.maximum.at(max_consecutive_steps, day, piece_last - run_starts[run] + 1)  # Runs count up from their start
+    return first_day, cumulative_steps, max_consecutive_steps
+
+
+def runs_from_status(status: np.ndarray):
+    """
+    Find the runs of fasting time steps in an array of fasting status.
+
+    Args:
+        status: Array of fasting status, 0 or 1 at each time step.
+
+    Returns: Tuple of int64 arrays (run_starts, run_ends) with the first and last time step position of each run.
+    """
+    edges = np.diff(np.concatenate([[0], np.asarray(status, dtype='int8'), [0]]))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1) - 1
+    return run_starts.astype('int64'), run_ends.astype('int64')
+
+
+def status_from_runs(run_starts: np.ndarray, run_ends: np.ndarray, periods: int) -> np.ndarray:
+    """
+    Expand runs of fasting time steps into an int64 array of fasting status (0 or 1 at each time step).
+
+    Args:
+        run_starts: First time step position of each run.
+        run_ends: Last time step position of each run.
+        periods: Number of time steps.
+
+    Returns: int64 array of fasting status.
+    """
+    boundaries = np.zeros(periods + 1, dtype='int64')
+    np.add.at(boundaries, run_starts, 1)
+    np.add.at(boundaries, run_ends + 1, -1)
+    return (np.cumsum(boundaries[:-1]) > 0).astype('int64')
+
+
+def run_counter(run_starts: np.ndarray, run_ends: np.ndarray, periods: int, status: np.ndarray = None) -> np.ndarray:
+    """
+    Count consecutive fasting time steps: 0 outside runs, counting up from 1 at the start of each run.
+
+    Example:
+        Runs =   [(1, 3), (5, 6)], periods = 7
+        Output = [0,1,2,3,0,1,2]
+
+    Args:
+        run_starts: First time step position of each run, runs must not overlap.
+        run_ends: Last time step position of each run.
+        periods: Number of time steps.
+        status: Fasting status of each time step if already available, otherwise expanded from the runs.
+
+    Returns: int64 array of consecutive fasting time steps.
+    """
+    if status is None:
+        status = status_from_runs(run_starts, run_ends, periods)
+
+    # Add one per fasting time step, and take each run's length back off right after it ends,
+    # so a single cumulative sum restarts the count at every run
+    increments = np.array(status, dtype='int64')
+    resets = run_ends + 1 < periods
+    increments[run_ends[resets] + 1] -= (run_ends - run_starts + 1)[resets]
+    return np.cumsum(increments)
+
+
+def split_at_midnight(starts: np.ndarray, ends: np.ndarray):
+    """
+    Split intervals of time at midnight, end exclusive: an interval ending exactly at midnight
+    does not add an empty piece to the next day.
+
+    Args:
+        starts: Interval start datetimes as int64 nanoseconds.
+        ends: Interval end datetimes as int64 nanoseconds, not before the starts.
+
+    Returns: Tuple of int64 arrays (interval, day, piece_starts, piece_ends)
+                - interval: Position of the interval each piece came from.
+                - day: Midnight of the day of each piece as int64 nanoseconds.
+                - piece_starts, piece_ends: Start and end of each piece as int64 nanoseconds.
+    """
+    first_day = starts - starts % NANOSECONDS_PER_DAY
+    last_instant = np.maximum(ends - 1, starts)  # End exclusive, zero length intervals keep one piece
+    last_day = last_instant - last_instant % NANOSECONDS_PER_DAY
+    pieces_per_interval = (last_day - first_day) // NANOSECONDS_PER_DAY + 1
+
+    interval = np.repeat(np.arange(len(starts)), pieces_per_interval)
+    offsets = np.arange(len(interval)) - np.repeat(np.cumsum(pieces_per_interval) - pieces_per_interval,
+                                                   pieces_per_interval)
+    day = first_day[interval] + offsets * NANOSECONDS_PER_DAY
+    piece_starts = np.maximum(starts[interval], day)
+    piece_ends = np.minimum(ends[interval], day + NANOSECONDS_PER_DAY)
+    return interval, day, piece_starts, piece_ends
+
+
+def containing_interval(starts: np.ndarray, ends: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Find the interval containing each point with a binary search, start and end inclusive.
+    A point on the end of one interval and the start of the next (back to back) belongs to the later interval.
+
+    Args:
+        starts: Interval start datetimes as int64 nanoseconds, sorted ascending.
+        ends: Interval end datetimes as int64 nanoseconds, intervals can not overlap.
+        points: Datetimes to locate as int64 nanoseconds, in any order.
+
+    Returns: int64 array with the position of the interval containing each point, -1 if no interval contains it.
+    """
+    interval = np.searchsorted(starts, points, side='right') - 1  # Last interval starting on or before the point
+    contained = interval >= 0
+    contained[contained] = points[contained] <= ends[interval[contained]]
+    return np.where(contained, interval, -1)
+
+
+def trailing_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum of each trailing window of values with one prefix sum, windows at the start cover the values available.
+
+    Args:
+        values: Values at each position.
+        window: Number of positions in a window, ending at and including each position.
+
+    Returns: Array of the sum of each window.
+    """
+    prefix = np.concatenate([[0], np.cumsum(values)])
+    positions = np.arange(1, len(values) + 1)
+    return prefix[positions] - prefix[np.maximum(positions - window, 0)]
+
+
+def range_max(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, empty=0) -> np.ndarray:
+    """
+    Maximum of values over each range of positions, with a sparse table of maxima over power of two ranges.
+
+    Args:
+        values: Values at each position.
+        starts: First position of each range.
+        ends: Position after the last position of each range, ranges where ends <= starts are empty.
+        empty: Value of empty ranges.
+
+    Returns: Array of the maximum of each range.
+    """
+    # table[level][i]: maximum of values[i:i + 2 ** level]
+    table = [np.asarray(values)]
+    while 2 ** len(table) <= len(values):
+        previous, half = table[-1], 2 ** (len(table) - 1)
+        table.append(np.maximum(previous[:-half], previous[half:]))
+
+    # Two overlapping power of two ranges cover each range
+    lengths = ends - starts
+    nonempty = lengths > 0
+    maxima = np.full(len(starts), empty, dtype=table[0].dtype)
+    levels = np.floor(np.log2(lengths[nonempty])).astype('int64')
+    for level in np.unique(levels):
+        ranges = np.flatnonzero(nonempty)[levels == level]
+        maxima[ranges] = np.maximum(table[level][starts[ranges]], table[level][ends[ranges] - 2 ** level])
+    return maxima
+
+
+def periodic_counts(run_starts: np.ndarray, run_ends: np.ndarray, offset: int, period: int) -> np.ndarray:
+    """
+    Fold runs of time steps into a histogram of position within a repeating period, e.g. minute of the day.
+    Each run adds whole periods to every bin and its remainder to a range of bins that may wrap around,
+    so the cost scales with the number of runs plus the period, not the length of the runs.
+
+    Args:
+        run_starts: First time step position of each run.
+        run_ends: Last time step position of each run (inclusive).
+        offset: Bin of time step position 0.
+        period: Number of bins in a period.
+
+    Returns: int64 array of the number of time steps in runs that fall in each bin.
+    """
+    lengths = run_ends - run_starts + 1
+    first_bins = (run_starts + offset) % period
+    remainders = lengths % period
+    last_bins = first_bins + remainders  # Exclusive, past the period if the remainder wraps around
+
+    boundaries = np.zeros(period + 1, dtype='int64')
+    boundaries[0] += (lengths // period).sum()
+    np.add.at(boundaries, first_bins, 1)
+    np.add.at(boundaries, np.minimum(last_bins, period), -1)
+    wraps = last_bins > period
+    boundaries[0] += wraps.sum()
+    np.add.at(boundaries, last_bins[wraps] - period, -1)
+    return np.cumsum(boundaries[:-1])
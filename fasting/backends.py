@@ -0,0 +1,162 @@
+"""
+Compute backends of the quantify module.
+
+The 'pandas' backend works through pandas objects (date ranges, label searches and resampling).
+The 'numpy' backend works on int64 arrays of nanoseconds since epoch with the kernels below, and pandas objects
+are only created for the results, which avoids most per call overhead for many small logs.
+Both backends return identical results through the same quantify functions.
+
+Select a backend per call with the quantify functions' backend argument, for a block of code with use_backend(),
+or globally with set_backend() or the FASTING_BACKEND environment variable.
+"""
+import contextlib
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from fasting import _intervals
+
+BACKENDS = ['pandas', 'numpy']
+BACKEND_ENV = 'FASTING_BACKEND'
+
+_backend = os.environ.get(BACKEND_ENV, 'pandas')
+
+
+def get_backend() -> str:
+    """Name of the global backend."""
+    return _backend
+
+
+def set_backend(backend: str):
+    """
+    Set the global backend, used by quantify functions called without a backend.
+
+    Args:
+        backend: One of BACKENDS.
+    """
+    global _backend
+    _backend = resolve(backend)
+
+
+@contextlib.contextmanager
+def use_backend(backend: str):
+    """
+    Use a backend within the context, restoring the previous global backend after.
+
+    Example:
+        with backends.use_backend('numpy'):
+            cumulative_hours = quantify.daily_cumulative_hours(continuous_log)
+
+    Args:
+        backend: One of BACKENDS.
+    """
+    previous = get_backend()
+    set_backend(backend)
+    try:
+        yield
+    finally:
+        set_backend(previous)
+
+
+def resolve(backend: Optional[str] = None) -> str:
+    """
+    Backend to use for a call: the backend given, else the global backend.
+
+    Args:
+        backend: One of BACKENDS, or None for the global backend.
+
+    Returns: Name of the backend.
+    """
+    backend = _backend if backend is None else backend
+    if backend not in BACKENDS:
+        raise ValueError(f"""
+                        Unknown backend: {backend}.
+                        Backend must be one of: {BACKENDS}.
+                        """)
+    return backend
+
+
+# NumPy kernels: datetimes are int64 nanoseconds since epoch, missing datetimes are NaT (the minimum int64)
+
+NAT = np.iinfo('int64').min
+
+
+def discrete_problems(starts: np.ndarray, ends: np.ndarray) -> Tuple[Optional[str], np.ndarray]:
+    """
+    Find the first kind of problem of a discrete log, in the order checked by quantify.validate_discrete_fasts().
+
+    Args:
+        starts: Fast start datetimes as int64 nanoseconds.
+        ends: Fast end datetimes as int64 nanoseconds, in the same order as starts.
+
+    Returns: Tuple (problem, positions): 'missing', 'start after end' or 'overlap' and the positions of
+             the offending fasts, or (None, empty array) if the log is valid.
+    """
+    missing = (starts == NAT) | (ends == NAT)
+    if missing.any():
+        return 'missing', np.flatnonzero(missing)
+    inverted = starts > ends
+    if inverted.any():
+        return 'start after end', np.flatnonzero(inverted)
+
+    order = None
+    if not (starts[1:] >= starts[:-1]).all():
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+    overlapping = np.flatnonzero(ends[:-1] > starts[1:]) + 1
+    if len(overlapping):
+        return 'overlap', overlapping if order is None else order[overlapping]
+    return None, np.zeros(0, dtype='int64')
+
+
+def continuous_status(starts: np.ndarray, ends: np.ndarray, step: int) -> Tuple[int, np.ndarray]:
+    """
+    Fasting status at each time step from the start of the first fast to the end of the last fast,
+    same time steps as quantify.continuous_fasts().
+
+    Args:
+        starts: Fast start datetimes as int64 nanoseconds, of a valid discrete log.
+        ends: Fast end datetimes as int64 nanoseconds, in the same order as starts.
+        step: Length of a time step in nanoseconds.
+
+    Returns: Tuple (origin, status): timestamp of the first time step as int64 nanoseconds,
+             and int64 array of fasting status (0 or 1) at each time step.
+    """
+    if not (starts[1:] >= starts[:-1]).all():
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+    origin = starts[0]
+    periods = (ends[-1] - origin) // step + 1  # Last time step: end of the latest starting fast
+    run_starts, run_ends = _intervals.grid_runs(starts, ends, origin, step)
+    run_ends = np.minimum(run_ends, periods - 1)
+    keep = run_starts <= run_ends
+    return origin, _intervals.status_from_runs(run_starts[keep], run_ends[keep], periods)
+
+
+def consecutive_steps(status: np.ndarray) -> np.ndarray:
+    """
+    Consecutive fasting time steps at each time step, see quantify.consecutive_minutes().
+
+    Args:
+        status: int64 array of fasting status (0 or 1).
+
+    Returns: int64 array of consecutive fasting time steps.
+    """
+    run_starts, run_ends = _intervals.runs_from_status(status)
+    return _intervals.run_counter(run_starts, run_ends, len(status), status=status)
+
+
+def daily_steps(status: np.ndarray, origin: int, step: int) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Daily cumulative and maximum consecutive fasting time steps, same days as a daily resample.
+
+    Args:
+        status: int64 array of fasting status (0 or 1).
+        origin: Timestamp of the first time step as int64 nanoseconds.
+        step: Length of a time step in nanoseconds.
+
+    Returns: Tuple (first_day, cumulative_steps, max_consecutive_steps), see _intervals.daily_runs().
+    """
+    run_starts, run_ends = _intervals.runs_from_status(status)
+    return _intervals.daily_runs(run_starts, run_ends, origin, len(status), step)
@@ -0,0 +1,179 @@
+"""Opt-in cache of parsed log exports and derived logs, keyed by the content of the export file."""
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from fasting import quantify
+from fasting.timeline import FastingTimeline
+
+
+class ExportCache:
+    """
+    Cache of discrete logs, continuous logs and daily metrics calculated from Zero Fasting log exports.
+
+    Entries are keyed by a SHA-256 hash of the export file's content plus the function parameters,
+    so a changed export is parsed again while an unchanged export is never parsed twice.
+    Entries are stored as int64 arrays: in an in-process least recently used (LRU) cache limited to max_bytes,
+    and optionally on local disk as NumPy .npz files to share entries between processes and sessions.
+    Continuous logs are stored run-length encoded (see FastingTimeline), the minute series is never cached.
+    Cached arrays are read-only, so results sharing them with the in-memory cache can not corrupt later hits.
+
+    Example:
+        cache = ExportCache(directory='~/.cache/fasting')
+        fasts = cache.zero_fasts('zero_export.csv')  # Parsed and cached
+        fasts = cache.zero_fasts('zero_export.csv')  # Cache hit, no CSV parsing
+
+    Args:
+        directory: Directory to store entries on disk, entries are kept in memory only if not given.
+        max_bytes: Maximum size of the entries kept in memory, least recently used entries are evicted first.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 64 * 2 ** 20):
+        self.directory = None
+        if directory is not None:
+            self.directory = os.path.expanduser(directory)
+            os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_bytes = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self._memory = OrderedDict()
+
+    def file_digest(self, path) -> str:
+        """
+        SHA-256 hash of a file's content. The file is read on every call: size and modification time
+        can stay the same when a file is rewritten, and hashing is much faster than parsing an export.
+
+        Args:
+            path: File path.
+
+        Returns: Hex digest of the file content.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(2 ** 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def zero_fasts(self, zero_log_file, date_format: str = quantify.ZERO_DATE_FORMAT,
+                   time_format: str = quantify.ZERO_TIME_FORMAT) -> pd.DataFrame:
+        """
+        Cached quantify.zero_fasts().
+
+        Args:
+            zero_log_file: File path of log export.
+            date_format: strftime format of the 'Date' column.
+            time_format: strftime format of the 'Start' and 'End' columns.
+
+        Returns: pandas DataFrame of the start and end datetimes of each fast.
+        """
+        def parse():
+            fasts = quantify.zero_fasts(zero_log_file, date_format=date_format, time_format=time_format)
+            return {'start_dt': fasts.start_dt.values.view('int64'), 'end_dt': fasts.end_dt.values.view('int64')}
+
+        arrays = self._cached('zero_fasts', zero_log_file, parse, date_format=date_format, time_format=time_format)
+        return pd.DataFrame({'start_dt': arrays['start_dt'].view('datetime64[ns]').copy(),
+                             'end_dt': arrays['end_dt'].view('datetime64[ns]').copy()})
+
+    def continuous_fasts(self, zero_log_file, compact: bool = False, date_format: str = quantify.ZERO_DATE_FORMAT,
+                         time_format: str = quantify.ZERO_TIME_FORMAT) -> Union[pd.Series, FastingTimeline]:
+        """
+        Cached quantify.continuous_fasts() of a log export.
+
+        Args:
+            zero_log_file: File path of log export.
+            compact: Return a FastingTimeline instead of a pandas Series.
+            date_format: strftime format of the 'Date' column.
+            time_format: strftime format of the 'Start' and 'End' columns.
+
+        Returns: pandas Series of fasting status at 1 minute frequency, or a FastingTimeline if compact.
+        """
+        def build():
+            fasts = self.zero_fasts(zero_log_file, date_format=date_format, time_format=time_format)
+            timeline = quantify.continuous_fasts(fasts, compact=True)
+            return {'start': np.array([timeline.start.value]), 'periods': np.array([timeline.periods]),
+                    'run_starts': timeline.run_starts, 'run_ends': timeline.run_ends}
+
+        arrays = self._cached('continuous_fasts', zero_log_file, build, date_format=date_format,
+                              time_format=time_format)
+        timeline = FastingTimeline(pd.Timestamp(arrays['start'][0]), arrays['periods'][0],
+                                   arrays['run_starts'], arrays['run_ends'])
+        return timeline if compact else timeline.to_series()
+
+    def daily_metrics(self, zero_log_file, date_format: str = quantify.ZERO_DATE_FORMAT,
+                      time_format: str = quantify.ZERO_TIME_FORMAT) -> pd.DataFrame:
+        """
+        Cached quantify.daily_cumulative_hours() and quantify.daily_max_consecutive_hours() of a log export.
+
+        Args:
+            zero_log_file: File path of log export.
+            date_format: strftime format of the 'Date' column.
+            time_format: strftime format of the 'Start' and 'End' columns.
+
+        Returns: pandas DataFrame of daily 'cumulative_hours' and 'max_consecutive_hours'.
+        """
+        def build():
+            timeline = self.continuous_fasts(zero_log_file, compact=True, date_format=date_format,
+                                             time_format=time_format)
+            daily = timeline.daily()
+            return {'days': daily.index.values.view('int64'), 'cumulative': daily.cumulative.values,
+                    'max_consecutive': daily.max_consecutive.values}
+
+        arrays = self._cached('daily_metrics', zero_log_file, build, date_format=date_format,
+                              time_format=time_format)
+        minutes_per_hour = 60
+        days = pd.DatetimeIndex(arrays['days'].view('datetime64[ns]'), freq='1D')
+        return pd.DataFrame({'cumulative_hours': arrays['cumulative'] / minutes_per_hour,
+                             'max_consecutive_hours': arrays['max_consecutive'] / minutes_per_hour}, index=days)
+
+    def clear(self):
+        """Remove all entries from memory and disk."""
+        self._memory.clear()
+        self.memory_bytes = 0
+        if self.directory is not None:
+            for filename in os.listdir(self.directory):
+                if filename.endswith('.npz'):
+                    os.remove(os.path.join(self.directory, filename))
+
+    def _cached(self, name: str, zero_log_file, compute: Callable[[], Dict[str, np.ndarray]],
+                **params) -> Dict[str, np.ndarray]:
+        """Get an entry from memory, then disk, computing and storing it if missing."""
+        parameters = hashlib.sha256(repr(sorted(params.items())).encode()).hexdigest()[:16]
+        key = f"{name}-{self.file_digest(zero_log_file)}-{parameters}"
+
+        if key in self._memory:
+            self.stats['memory_hits'] += 1
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        path = None if self.directory is None else os.path.join(self.directory, f"{key}.npz")
+        if path is not None and os.path.exists(path):
+            self.stats['disk_hits'] += 1
+            with np.load(path) as entry:
+                arrays = {array: entry[array] for array in entry.files}
+        else:
+            self.stats['misses'] += 1
+            arrays = compute()
+            if path is not None:
+                temporary_path = f"{path}.{os.getpid()}.tmp.npz"
+                np.savez(temporary_path, **arrays)
+                os.replace(temporary_path, path)  # Atomic, other processes never read a partial entry
+
+        for array in arrays.values():
+            array.setflags(write=False)
+        self._remember(key, arrays)
+        return arrays
+
+    def _remember(self, key: str, arrays: Dict[str, np.ndarray]):
+        """Keep an entry in memory, evicting least recently used entries to stay within max_bytes."""
+        size = sum(array.nbytes for array in arrays.values())
+        if size > self.max_bytes:
+            return
+        self._memory[key] = arrays
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_bytes -= sum(array.nbytes for array in evicted.values())
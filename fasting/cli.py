@@ -1,16 +1,163 @@
-"""Console script for fasting."""
+"""
+Console script for fasting.
+pandas and the fasting modules are imported when a command runs, not when the script starts,
+so argument parsing, --help and errors in arguments return quickly.
+"""
+import collections
+import os
 import sys
+import time
+
 import click
 
+FORMATS = ['csv', 'parquet']
+
 
 @click.command()
-def main(args=None):
-    """Console script for fasting."""
-    click.echo("Replace this message by putting your code into "
-               "fasting.cli.main")
-    click.echo("See click documentation at https://click.palletsprojects.com/")
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('-o', '--output', default='-', show_default=True, type=click.Path(),
+              help="File to write the daily metrics to, '-' for standard output (csv only).")
+@click.option('-f', '--format', 'output_format', type=click.Choice(FORMATS),
+              help="Output format, inferred from the output file extension by default.")
+@click.option('-j', '--jobs', default=1, show_default=True, type=click.IntRange(min=0),
+              help="Number of worker processes, 0 for one per processor.")
+@click.option('-q', '--quiet', is_flag=True, help="Do not print per file timing.")
+def main(paths, output, output_format, jobs, quiet):
+    """
+    Calculate the daily fasting metrics of Zero Fasting log exports.
+
+    PATHS are log export files or directories of log exports (*.csv). Each export is one user, identified by its
+    file name without extension. Daily metrics are written to the output as each export is processed, in long
+    format with columns 'user_id', 'date', 'cumulative_hours' and 'max_consecutive_hours'.
+    Timing and failures are printed to standard error. Exits with status 1 if any export fails.
+    """
+    exports = _find_exports(paths)
+    output_format = output_format or ('parquet' if output.endswith('.parquet') else 'csv')
+    if output_format == 'parquet' and output == '-':
+        raise click.UsageError("Parquet output requires an output file, see --output.")
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    writer = _ParquetWriter(output) if output_format == 'parquet' else _CsvWriter(output)
+    started = time.perf_counter()
+    try:
+        if jobs == 1:
+            failures, total_bytes = _write_results(map(_timed_process_user, exports), writer, quiet)
+        else:
+            jobs = jobs or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = _bounded_map(executor, _timed_process_user, exports, window=2 * jobs)
+                failures, total_bytes = _write_results(results, writer, quiet)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"Processed {len(exports)} exports ({failures} failed) in {elapsed:.2f}s: "
+               f"{len(exports) / elapsed:.1f} exports/s, {total_bytes / 2 ** 20 / elapsed:.2f} MiB/s", err=True)
+    if failures:
+        sys.exit(1)
     return 0
 
 
+def _find_exports(paths):
+    """List (user_id, file path) of the log exports in files and directories."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, filename) for filename in sorted(os.listdir(path))
+                         if filename.endswith('.csv'))
+        else:
+            files.append(path)
+    return [(os.path.splitext(os.path.basename(file))[0], file) for file in files]
+
+
+def _bounded_map(executor, function, items, window: int):
+    """
+    Map a function over items in a process pool, yielding results in order of the items.
+    At most window items are submitted at a time, so only the results waiting to be written are held in memory.
+    """
+    pending = collections.deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _timed_process_user(user_export):
+    """Process one user's export (see cohort.process_user), adding the file size and processing time."""
+    from fasting import cohort
+
+    started = time.perf_counter()
+    user_id, metrics, error = cohort.process_user(user_export)
+    size = os.path.getsize(user_export[1]) if error is None else 0
+    return user_id, metrics, error, size, time.perf_counter() - started
+
+
+def _write_results(results, writer, quiet):
+    """Write each result as it arrives and report its timing, returning the number of failures and bytes read."""
+    failures = 0
+    total_bytes = 0
+    for user_id, metrics, error, size, seconds in results:
+        if error is not None:
+            failures += 1
+            click.echo(f"{user_id}: failed, {error}", err=True)
+            continue
+        writer.write(metrics)
+        total_bytes += size
+        if not quiet:
+            click.echo(f"{user_id}: {len(metrics)} days in {seconds:.3f}s ({size / 2 ** 10 / seconds:.1f} KiB/s)",
+                       err=True)
+    return failures, total_bytes
+
+
+class _CsvWriter:
+    """Append daily metrics to a CSV file, writing the header once."""
+
+    def __init__(self, output: str):
+        self.file = sys.stdout if output == '-' else open(output, 'w', newline='')
+        self.header = True
+
+    def write(self, metrics):
+        from fasting import cohort
+
+        metrics.to_csv(self.file, header=self.header, index=False, columns=cohort.METRIC_COLUMNS)
+        self.header = False
+
+    def close(self):
+        import pandas as pd
+        from fasting import cohort
+
+        if self.header:
+            self.write(pd.DataFrame(columns=cohort.METRIC_COLUMNS))
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class _ParquetWriter:
+    """Append daily metrics to a Parquet file, one row group per export (requires pyarrow)."""
+
+    def __init__(self, output: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise click.UsageError("Parquet output requires pyarrow: pip install pyarrow") from None
+        self.pyarrow = pyarrow
+        self.output = output
+        self.writer = None
+
+    def write(self, metrics):
+        table = self.pyarrow.Table.from_pandas(metrics.astype({'user_id': str}), preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.output, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
 if __name__ == "__main__":
     sys.exit(main())  # pragma: no cover
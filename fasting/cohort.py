@@ -0,0 +1,273 @@
+"""Process fasting logs for a cohort of users."""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Hashable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fasting import _intervals
+from fasting import quantify
+
+METRIC_COLUMNS = ['user_id', 'date', 'cumulative_hours', 'max_consecutive_hours']
+FAILURE_COLUMNS = ['user_id', 'error']
+
+# Minutes in each period of CohortAggregate, and minutes from the start of a period to the Unix epoch
+# (Thursday 1/1/70 00:00), so weeks start Monday midnight
+PERIOD_MINUTES = {'day': 24 * 60, 'week': 7 * 24 * 60}
+PERIOD_OFFSET_MINUTES = {'day': 0, 'week': 3 * 24 * 60}
+
+
+def user_daily_metrics(zero_log_file, repair: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a log export from Zero Fasting and calculate the daily fasting metrics.
+
+    Args:
+        zero_log_file: File path of log export.
+        repair: Repair overlapping fasts with this policy before validation, see quantify.repair_discrete_fasts().
+
+    Returns: pandas DataFrame with columns 'date', 'cumulative_hours' and 'max_consecutive_hours'.
+    """
+    fasts = quantify.zero_fasts(zero_log_file)
+    if repair is not None:
+        fasts, _ = quantify.repair_discrete_fasts(fasts, policy=repair)
+    timeline = quantify.continuous_fasts(fasts, compact=True)
+    metrics = pd.DataFrame({'cumulative_hours': quantify.daily_cumulative_hours(timeline, validate=False),
+                            'max_consecutive_hours': quantify.daily_max_consecutive_hours(timeline, validate=False)})
+    metrics.index.name = 'date'
+    return metrics.reset_index()
+
+
+def process_user(user_export: Tuple[Hashable, str], repair: Optional[str] = None):
+    """
+    Calculate one user's daily metrics in long format, returning the error message instead of raising
+    for an export that can not be loaded or fails validation. Suited to mapping over a cohort in a process pool.
+
+    Args:
+        user_export: Tuple (user_id, zero_log_file) of the user id and file path of the user's log export.
+        repair: Repair overlapping fasts with this policy before validation, see quantify.repair_discrete_fasts().
+
+    Returns: Tuple (user_id, metrics, error)
+                - metrics: pandas DataFrame with columns 'user_id', 'date', 'cumulative_hours' and
+                  'max_consecutive_hours', None if the user failed.
+                - error: Error message, None if the user succeeded.
+    """
+    _validate_repair(repair)  # An unknown policy is an error of the call, not of the user's log
+    user_id, zero_log_file = user_export
+    try:
+        metrics = user_daily_metrics(zero_log_file, repair=repair)
+    except (ValueError, OSError) as error:
+        return user_id, None, f"{type(error).__name__}: {str(error).strip()}"
+    metrics.insert(0, 'user_id', user_id)
+    return user_id, metrics, None
+
+
+def cohort_daily_metrics(exports: Mapping[Hashable, str], workers: Optional[int] = None,
+                         chunksize: int = 1, repair: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Calculate the daily fasting metrics for many users' Zero Fasting log exports in a process pool.
+    Users whose export can not be loaded or fails validation (see quantify.validate_discrete_fasts())
+    are reported as failures and do not stop the rest of the cohort.
+
+    Args:
+        exports: Mapping of user id to file path of the user's log export.
+        workers: Number of worker processes, defaults to the number of processors.
+                 Use 1 to process the cohort in the current process.
+        chunksize: Number of users sent to a worker process at a time.
+                   Larger chunks reduce overhead for cohorts of many small exports.
+        repair: Repair overlapping fasts with this policy instead of reporting the user as a failure,
+                see quantify.repair_discrete_fasts().
+
+    Returns: Tuple of pandas DataFrames (metrics, failures)
+                - metrics: Long format daily metrics with columns
+                  'user_id', 'date', 'cumulative_hours' and 'max_consecutive_hours'.
+                - failures: Users that could not be processed with columns 'user_id' and 'error'.
+    """
+    _validate_repair(repair)
+    user_exports = list(exports.items())
+    process = partial(process_user, repair=repair)
+    if workers == 1:
+        results = [process(user_export) for user_export in user_exports]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(process, user_exports, chunksize=chunksize))
+
+    user_metrics = [metrics for _, metrics, _ in results if metrics is not None]
+    if user_metrics:
+        metrics = pd.concat(user_metrics, ignore_index=True)
+    else:
+        metrics = pd.DataFrame(columns=METRIC_COLUMNS)
+    failures = pd.DataFrame([(user_id, error) for user_id, _, error in results if error is not None],
+                            columns=FAILURE_COLUMNS)
+    return metrics, failures
+
+
+class CohortAggregate:
+    """
+    Fixed size aggregate of a cohort's fasting: minutes fasted at each minute of the day (or week) and the
+    distribution of daily hours fasted. Each user's fasts are folded in with interval arithmetic on the runs of
+    fasting minutes, so memory does not grow with the number of users or years, and aggregates built in separate
+    processes can be merged.
+
+    Example:
+        aggregate = CohortAggregate(period='week')
+        aggregate.add(quantify.zero_fasts('user_a.csv'))
+        aggregate.add(quantify.zero_fasts('user_b.csv'))
+        aggregate.fraction_fasting()  # Share of users fasting at each minute of the week
+
+    Args:
+        period: 'day' for minute of the day, or 'week' for minute of the week starting Monday midnight.
+        hours_bin: Width of the bins of the daily hours distributions, in hours.
+    """
+
+    def __init__(self, period: str = 'day', hours_bin: float = 1):
+        if period not in PERIOD_MINUTES:
+            raise ValueError(f"""
+                            Unknown period: {period}.
+                            Period must be one of: {list(PERIOD_MINUTES)}.
+                            """)
+        self.period = period
+        self.hours_bin = hours_bin
+        bins = int(np.ceil(24 / hours_bin)) + 1  # The last bin holds days of exactly 24 hours
+        self.fasting_minutes = np.zeros(PERIOD_MINUTES[period], dtype='int64')
+        self.observed_minutes = np.zeros(PERIOD_MINUTES[period], dtype='int64')
+        self.daily_hours_counts = np.zeros(bins, dtype='int64')
+        self.user_hours_counts = np.zeros(bins, dtype='int64')
+        self.users = 0
+
+    def add(self, fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt', validate: bool = True):
+        """
+        Fold one user's discrete log into the aggregate. A user is observed from the start of their first fast
+        to the end of their last fast.
+
+        Args:
+            fasts: DataFrame of discrete logs with start and end datetime columns.
+            start_col: Name of column representing fasting start datetimes.
+            end_col: Name of column representing fasting end datetimes.
+            validate: Validate the discrete log first, see quantify.validate_discrete_fasts().
+        """
+        timeline = quantify.continuous_fasts(fasts, start_col, end_col, compact=True, validate=validate)
+        minutes = timeline.start.value // _intervals.NANOSECONDS_PER_MINUTE
+        offset = (minutes + PERIOD_OFFSET_MINUTES[self.period]) % len(self.fasting_minutes)
+        self.fasting_minutes += _intervals.periodic_counts(timeline.run_starts, timeline.run_ends, offset,
+                                                           len(self.fasting_minutes))
+        self.observed_minutes += _intervals.periodic_counts(np.array([0]), np.array([timeline.periods - 1]),
+                                                            offset, len(self.fasting_minutes))
+
+        minutes_per_hour = 60
+        daily_hours = timeline.daily_sum().to_numpy() / minutes_per_hour
+        self.daily_hours_counts += np.bincount(self._hours_bin(daily_hours), minlength=len(self.daily_hours_counts))
+        self.user_hours_counts[self._hours_bin(daily_hours.mean())] += 1
+        self.users += 1
+
+    def merge(self, other: 'CohortAggregate') -> 'CohortAggregate':
+        """
+        Combine with an aggregate of other users, e.g. from another worker process.
+
+        Args:
+            other: CohortAggregate with the same period and hours_bin.
+
+        Returns: New CohortAggregate of both cohorts.
+        """
+        if (self.period, self.hours_bin) != (other.period, other.hours_bin):
+            raise ValueError("Only aggregates with the same period and hours_bin can be merged.")
+        merged = CohortAggregate(self.period, self.hours_bin)
+        for name in ['fasting_minutes', 'observed_minutes', 'daily_hours_counts', 'user_hours_counts', 'users']:
+            setattr(merged, name, getattr(self, name) + getattr(other, name))
+        return merged
+
+    def __add__(self, other: 'CohortAggregate') -> 'CohortAggregate':
+        return self.merge(other)
+
+    def fraction_fasting(self) -> pd.Series:
+        """
+        Share of observed user-days (or user-weeks) fasting at each minute of the period.
+
+        Returns: pandas Series indexed by time since midnight (or Monday midnight), NaN for minutes never observed.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = self.fasting_minutes / self.observed_minutes
+        return pd.Series(fraction, index=pd.timedelta_range(start=0, periods=len(fraction), freq='1T'))
+
+    def daily_hours_distribution(self) -> pd.DataFrame:
+        """
+        Distribution of daily cumulative hours fasted across the cohort.
+
+        Returns: pandas DataFrame indexed by the lower edge of each bin of hours, with columns:
+                    - 'user_days': Number of user-days with daily hours fasted in the bin.
+                    - 'users': Number of users with average daily hours fasted in the bin.
+        """
+        edges = np.arange(len(self.daily_hours_counts)) * self.hours_bin
+        return pd.DataFrame({'user_days': self.daily_hours_counts, 'users': self.user_hours_counts},
+                            index=pd.Index(edges, name='hours'))
+
+    def _hours_bin(self, hours):
+        return np.minimum(np.floor(np.asarray(hours) / self.hours_bin).astype('int64'),
+                          len(self.daily_hours_counts) - 1)
+
+
+def cohort_aggregate(exports: Mapping[Hashable, str], period: str = 'day', hours_bin: float = 1,
+                     workers: Optional[int] = None, chunksize: int = 100,
+                     repair: Optional[str] = None) -> Tuple[CohortAggregate, pd.DataFrame]:
+    """
+    Aggregate many users' Zero Fasting log exports in a process pool, see CohortAggregate.
+    Each worker folds a chunk of users into one aggregate and the chunk aggregates are merged,
+    so memory does not grow with the size of the cohort.
+
+    Args:
+        exports: Mapping of user id to file path of the user's log export.
+        period: 'day' for minute of the day, or 'week' for minute of the week.
+        hours_bin: Width of the bins of the daily hours distributions, in hours.
+        workers: Number of worker processes, defaults to the number of processors.
+                 Use 1 to process the cohort in the current process.
+        chunksize: Number of users folded into an aggregate by a worker process at a time.
+        repair: Repair overlapping fasts with this policy instead of reporting the user as a failure,
+                see quantify.repair_discrete_fasts().
+
+    Returns: Tuple (aggregate, failures)
+                - aggregate: CohortAggregate of the users that could be processed.
+                - failures: pandas DataFrame of users that could not be processed with columns 'user_id' and 'error'.
+    """
+    _validate_repair(repair)
+    user_exports = list(exports.items())
+    chunks = [user_exports[first:first + chunksize] for first in range(0, len(user_exports), chunksize)]
+    aggregate_chunk = partial(_aggregate_chunk, period=period, hours_bin=hours_bin, repair=repair)
+
+    if workers == 1:
+        return _merge_chunks(map(aggregate_chunk, chunks), period, hours_bin)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _merge_chunks(executor.map(aggregate_chunk, chunks), period, hours_bin)
+
+
+def _merge_chunks(results, period: str, hours_bin: float) -> Tuple[CohortAggregate, pd.DataFrame]:
+    """Merge chunk aggregates as they arrive, collecting the failures."""
+    aggregate = CohortAggregate(period, hours_bin)
+    failures = []
+    for chunk_aggregate, chunk_failures in results:
+        aggregate = aggregate.merge(chunk_aggregate)
+        failures.extend(chunk_failures)
+    return aggregate, pd.DataFrame(failures, columns=FAILURE_COLUMNS)
+
+
+def _aggregate_chunk(user_exports, period: str, hours_bin: float, repair: Optional[str]):
+    """Fold a chunk of users' exports into one aggregate, returning error messages for invalid logs."""
+    aggregate = CohortAggregate(period, hours_bin)
+    failures = []
+    for user_id, zero_log_file in user_exports:
+        try:
+            fasts = quantify.zero_fasts(zero_log_file)
+            if repair is not None:
+                fasts, _ = quantify.repair_discrete_fasts(fasts, policy=repair)
+            aggregate.add(fasts)
+        except (ValueError, OSError) as error:
+            failures.append((user_id, f"{type(error).__name__}: {str(error).strip()}"))
+    return aggregate, failures
+
+
+def _validate_repair(repair: Optional[str]):
+    """Raise for an unknown repair policy before any user is processed, see quantify.repair_discrete_fasts()."""
+    if repair is not None and repair not in quantify.REPAIR_POLICIES:
+        raise ValueError(f"""
+                        Unknown repair policy: {repair}.
+                        Policy must be one of: {quantify.REPAIR_POLICIES}.
+                        """)
@@ -0,0 +1,319 @@
+"""Update a continuous log and daily fasting metrics as new fasts are logged, without recalculating history."""
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from fasting import _intervals
+from fasting import quantify
+from fasting.timeline import FastingTimeline
+
+
+class FastingState:
+    """
+    Compact state of a continuous log, enough to extend it and its daily metrics with newly logged fasts.
+
+    The state holds only the end of the log: the last timestamp, the consecutive minutes fasted at that
+    timestamp (the trailing run) and the cumulative and maximum consecutive minutes of the last day.
+    Results of append() are identical to recalculating quantify.continuous_fasts(),
+    quantify.daily_cumulative_hours() and quantify.daily_max_consecutive_hours() on the full discrete log.
+
+    Example:
+        state, continuous_log, cumulative_hours, max_consecutive_hours = FastingState.from_discrete(fasts)
+        continuous_tail, cumulative_update, max_update = state.append(new_fasts)
+        continuous_log = pd.concat([continuous_log, continuous_tail])
+        cumulative_hours = cumulative_update.combine_first(cumulative_hours)
+        max_consecutive_hours = max_update.combine_first(max_consecutive_hours)
+
+    Args:
+        origin: Timestamp of the first time step of the continuous log.
+        last_end: End datetime of the latest fast.
+        last_position: Position of the last time step of the continuous log.
+        trailing_run: Consecutive minutes fasted at the last time step.
+        last_day_cumulative: Cumulative minutes fasted on the day of the last time step.
+        last_day_max_consecutive: Maximum consecutive minutes fasted on the day of the last time step.
+    """
+
+    step = _intervals.NANOSECONDS_PER_MINUTE
+    minutes_per_hour = 60
+
+    def __init__(self, origin, last_end, last_position: int, trailing_run: int, last_day_cumulative: int,
+                 last_day_max_consecutive: int):
+        self.origin = pd.Timestamp(origin)
+        self.last_end = pd.Timestamp(last_end)
+        self.last_position = int(last_position)
+        self.trailing_run = int(trailing_run)
+        self.last_day_cumulative = int(last_day_cumulative)
+        self.last_day_max_consecutive = int(last_day_max_consecutive)
+
+    @property
+    def last_timestamp(self) -> pd.Timestamp:
+        """Timestamp of the last time step of the continuous log."""
+        return self.origin + pd.Timedelta(self.last_position * self.step, unit='ns')
+
+    @classmethod
+    def from_discrete(cls, fasts: pd.DataFrame, start_col: str = 'start_dt',
+                      end_col: str = 'end_dt') -> Tuple['FastingState', pd.Series, pd.Series, pd.Series]:
+        """
+        Calculate the continuous log and daily metrics of a discrete log, and the state to extend them.
+
+        Args:
+            fasts: DataFrame of discrete logs with start and end datetime columns.
+            start_col: Name of column representing fasting start datetimes.
+            end_col: Name of column representing fasting end datetimes.
+
+        Returns: Tuple (state, continuous log, daily cumulative hours, daily maximum consecutive hours).
+        """
+        timeline = quantify.continuous_fasts(fasts, start_col, end_col, compact=True)
+        cumulative_mins = timeline.daily_sum()
+        max_consecutive_mins = timeline.daily_max_consecutive()
+
+        last_position = timeline.periods - 1
+        trailing_run = 0
+        if len(timeline.run_ends) and timeline.run_ends[-1] == last_position:
+            trailing_run = last_position - timeline.run_starts[-1] + 1
+
+        state = cls(origin=timeline.start,
+                    last_end=fasts[end_col].max(),
+                    last_position=last_position,
+                    trailing_run=trailing_run,
+                    last_day_cumulative=cumulative_mins.iloc[-1],
+                    last_day_max_consecutive=max_consecutive_mins.iloc[-1])
+        return (state, timeline.to_series(),
+                cumulative_mins / cls.minutes_per_hour, max_consecutive_mins / cls.minutes_per_hour)
+
+    def append(self, fasts: pd.DataFrame, start_col: str = 'start_dt',
+               end_col: str = 'end_dt') -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """
+        Extend the continuous log and daily metrics with newly logged fasts, and update the state.
+        Only the days from the last day of the current log onwards are recalculated.
+
+        Args:
+            fasts: DataFrame of new discrete logs, each starting at or after the end of the latest fast.
+            start_col: Name of column representing fasting start datetimes.
+            end_col: Name of column representing fasting end datetimes.
+
+        Returns: Tuple of pandas Series (continuous tail, cumulative hours, max consecutive hours)
+                    - continuous tail: Fasting status of the time steps after the current last timestamp.
+                    - cumulative hours: Daily cumulative hours fasted of the affected days.
+                    - max consecutive hours: Daily maximum consecutive hours fasted of the affected days.
+                 The first affected day replaces the current last day if they are the same date.
+        """
+        if not quantify.validate_discrete_fasts(fasts, start_col, end_col):
+            raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+
+        fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+        if fasts[start_col].iloc[0] < self.last_end:
+            raise ValueError(f"""
+                            New fasts must start at or after the end of the latest fast: {self.last_end}.
+                            The following fasts overlap with the latest fast:
+                            {fasts[fasts[start_col] < self.last_end]}
+                            """)
+
+        starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+        ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+        origin = self.origin.value
+
+        # Time steps after the current log, positions relative to the first new time step
+        window_start = self.last_position + 1
+        window_origin = origin + window_start * self.step
+        periods = (ends.max() - origin) // self.step + 1 - window_start
+        first = -((origin - starts) // self.step) - window_start
+        last = (ends - origin) // self.step - window_start
+        first = np.maximum(first, 0)  # A fast starting exactly at the last timestamp is already fasting there
+
+        # Carry the trailing run over as a run ending at the last time step of the current log
+        if self.trailing_run:
+            first = np.concatenate([[-self.trailing_run], first])
+            last = np.concatenate([[-1], last])
+        run_starts, run_ends = _intervals.merge_runs(first, last)
+        window_runs = run_ends >= 0
+        run_starts, run_ends = run_starts[window_runs], run_ends[window_runs]
+
+        self.last_end = max(self.last_end, fasts[end_col].max())
+        if periods <= 0:  # New fasts end before the next time step
+            empty = pd.Series(dtype='float64', index=pd.DatetimeIndex([]))
+            return pd.Series(dtype='int64', index=pd.DatetimeIndex([])), empty, empty.copy()
+
+        continuous_tail = pd.Series(
+            _intervals.status_from_runs(np.maximum(run_starts, 0), run_ends, periods),
+            index=pd.date_range(start=pd.Timestamp(window_origin), periods=periods, freq='1T'))
+        first_day, cumulative_mins, max_consecutive_mins = _intervals.daily_runs(
+            run_starts, run_ends, window_origin, periods, self.step)
+        days = pd.date_range(start=pd.Timestamp(first_day), periods=len(cumulative_mins), freq='1D')
+
+        # Combine with the current last day when the first new time step falls on it
+        if days[0] == self.last_timestamp.normalize():
+            cumulative_mins[0] += self.last_day_cumulative
+            max_consecutive_mins[0] = max(max_consecutive_mins[0], self.last_day_max_consecutive)
+
+        # Update the state to the end of the extended log
+        self.last_position += periods
+        self.trailing_run = 0
+        if len(run_ends) and run_ends[-1] == periods - 1:
+            self.trailing_run = periods - run_starts[-1]
+        self.last_day_cumulative = cumulative_mins[-1]
+        self.last_day_max_consecutive = max_consecutive_mins[-1]
+
+        cumulative_hours = pd.Series(cumulative_mins, index=days) / self.minutes_per_hour
+        max_consecutive_hours = pd.Series(max_consecutive_mins, index=days) / self.minutes_per_hour
+        return continuous_tail, cumulative_hours, max_consecutive_hours
+
+    def __repr__(self) -> str:
+        return (f"FastingState(last_timestamp={self.last_timestamp}, trailing_run={self.trailing_run}, "
+                f"last_day_cumulative={self.last_day_cumulative}, "
+                f"last_day_max_consecutive={self.last_day_max_consecutive})")
+
+
+class WindowedDailyMetrics:
+    """
+    Daily fasting metrics of a continuous log processed in consecutive chunks, e.g. a month at a time,
+    so peak memory depends on the chunk size rather than the length of the log.
+
+    Between chunks only the trailing run (consecutive minutes fasted at the end of the last chunk) and the
+    partial last day are carried over. Days are returned once a later chunk starts after them, concatenated they
+    are identical to quantify.daily_cumulative_hours() and quantify.daily_max_consecutive_hours() of the full log.
+
+    Example:
+        windowed = WindowedDailyMetrics()
+        for chunk in continuous_chunks(fasts, window='30D'):
+            completed_days = windowed.update(chunk)
+        last_day = windowed.finish()
+    """
+
+    step = _intervals.NANOSECONDS_PER_MINUTE
+    minutes_per_hour = 60
+
+    def __init__(self):
+        self.next_timestamp: Optional[pd.Timestamp] = None
+        self.trailing_run = 0
+        self.day: Optional[pd.Timestamp] = None
+        self.day_cumulative = 0
+        self.day_max_consecutive = 0
+
+    def update(self, chunk: Union[pd.Series, FastingTimeline], validate: bool = True) -> pd.DataFrame:
+        """
+        Add the next chunk of the continuous log.
+
+        Args:
+            chunk: Next time steps of the continuous log at a 1 minute frequency, as a pandas Series or
+                   FastingTimeline, starting one minute after the previous chunk.
+            validate: Validate the chunk first, see quantify.validate_continuous_fasts().
+
+        Returns: pandas DataFrame of daily 'cumulative_hours' and 'max_consecutive_hours' of the days completed by
+                 the chunk, every day before the last day of the chunk.
+        """
+        if validate and not quantify.validate_continuous_fasts(chunk):
+            raise Exception('Continuous log is invalid. Check error raised by validate_continuous_log().')
+        if not len(chunk):
+            return self._metrics([], [], [])
+
+        if isinstance(chunk, FastingTimeline):
+            start = chunk.start
+            run_starts, run_ends = chunk.run_starts, chunk.run_ends
+        else:
+            start = chunk.index[0]
+            run_starts, run_ends = _intervals.runs_from_status(chunk.to_numpy(dtype='int64'))
+        if self.next_timestamp is not None and start != self.next_timestamp:
+            raise ValueError(f"""
+                            Chunks must be consecutive, the next chunk must start at: {self.next_timestamp}.
+                            Chunk starts at: {start}.
+                            """)
+        periods = len(chunk)
+
+        # Carry the trailing run over as a run starting before the chunk (negative position)
+        if self.trailing_run and len(run_starts) and run_starts[0] == 0:
+            run_starts = run_starts.copy()
+            run_starts[0] = -self.trailing_run
+        first_day, cumulative_mins, max_consecutive_mins = _intervals.daily_runs(
+            run_starts, run_ends, start.value, periods, self.step)
+        days = pd.date_range(start=pd.Timestamp(first_day), periods=len(cumulative_mins), freq='1D')
+
+        # Combine with the partial day carried over from the previous chunk
+        days, cumulative_mins, max_consecutive_mins = list(days), list(cumulative_mins), list(max_consecutive_mins)
+        if self.day is not None:
+            if days[0] == self.day:
+                cumulative_mins[0] += self.day_cumulative
+                max_consecutive_mins[0] = max(max_consecutive_mins[0], self.day_max_consecutive)
+            else:
+                days.insert(0, self.day)
+                cumulative_mins.insert(0, self.day_cumulative)
+                max_consecutive_mins.insert(0, self.day_max_consecutive)
+
+        # Carry the trailing run and the last day, which the next chunk may continue
+        self.next_timestamp = start + periods * pd.Timedelta(self.step, unit='ns')
+        self.trailing_run = 0
+        if len(run_ends) and run_ends[-1] == periods - 1:
+            self.trailing_run = int(run_ends[-1] - run_starts[-1] + 1)
+        self.day = days[-1]
+        self.day_cumulative = cumulative_mins[-1]
+        self.day_max_consecutive = max_consecutive_mins[-1]
+        return self._metrics(days[:-1], cumulative_mins[:-1], max_consecutive_mins[:-1])
+
+    def finish(self) -> pd.DataFrame:
+        """
+        Complete the last day after the last chunk.
+
+        Returns: pandas DataFrame of daily 'cumulative_hours' and 'max_consecutive_hours' of the last day,
+                 empty if no chunk was added.
+        """
+        if self.day is None:
+            return self._metrics([], [], [])
+        metrics = self._metrics([self.day], [self.day_cumulative], [self.day_max_consecutive])
+        self.day = None
+        return metrics
+
+    def _metrics(self, days, cumulative_mins, max_consecutive_mins) -> pd.DataFrame:
+        return pd.DataFrame({'cumulative_hours': np.asarray(cumulative_mins, dtype='int64') / self.minutes_per_hour,
+                             'max_consecutive_hours': (np.asarray(max_consecutive_mins, dtype='int64')
+                                                       / self.minutes_per_hour)},
+                            index=pd.DatetimeIndex(days))
+
+
+def windowed_daily_metrics(chunks: Iterable[Union[pd.Series, FastingTimeline]],
+                           validate: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Daily fasting metrics of a continuous log given as consecutive chunks, see WindowedDailyMetrics.
+    Only one chunk is held in memory at a time when chunks come from a generator, e.g. continuous_chunks().
+
+    Args:
+        chunks: Consecutive chunks of a continuous log at a 1 minute frequency.
+        validate: Validate each chunk first, see quantify.validate_continuous_fasts().
+
+    Returns: Iterator of pandas DataFrames of daily 'cumulative_hours' and 'max_consecutive_hours',
+             each completed day returned once in order.
+    """
+    windowed = WindowedDailyMetrics()
+    for chunk in chunks:
+        completed_days = windowed.update(chunk, validate=validate)
+        if len(completed_days):
+            yield completed_days
+    last_day = windowed.finish()
+    if len(last_day):
+        yield last_day
+
+
+def continuous_chunks(fasts: pd.DataFrame, window: str = '30D', start_col: str = 'start_dt',
+                      end_col: str = 'end_dt', compact: bool = False,
+                      validate: bool = True) -> Iterator[Union[pd.Series, FastingTimeline]]:
+    """
+    Generate the continuous log of a discrete log in consecutive chunks, without creating the full log.
+    The fasts are held as runs of fasting minutes (see FastingTimeline) and each chunk is created when requested.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        window: Length of each chunk, e.g. '30D'. The last chunk may be shorter.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        compact: Generate FastingTimeline chunks instead of pandas Series.
+        validate: Validate the discrete log first, see quantify.validate_discrete_fasts().
+
+    Returns: Iterator of consecutive chunks of the continuous log, same time steps as quantify.continuous_fasts().
+    """
+    timeline = quantify.continuous_fasts(fasts, start_col, end_col, compact=True, validate=validate)
+    periods = pd.Timedelta(window).value // timeline.step
+    if periods < 1:
+        raise ValueError(f"Window must be at least one time step: {window}.")
+    for first in range(0, timeline.periods, periods):
+        chunk = timeline[first:first + periods]
+        yield chunk if compact else chunk.to_series()
@@ -0,0 +1,223 @@
+"""
+Opt-in profiling of the quantify module: wall time, rows processed and memory peaks of each stage.
+
+Calls from every thread are recorded while a profile is active, each thread (or asyncio task) nesting its own
+stages. Memory is traced for the whole process, so peaks of stages running concurrently include each other's
+allocations.
+"""
+import atexit
+import contextlib
+import contextvars
+import functools
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+# Set to profile the whole process and print a report to standard error at exit: 1 for time, 'memory' to add peaks
+PROFILE_ENV = 'FASTING_PROFILE'
+
+
+class ProfileRecord(NamedTuple):
+    """
+    One call of a profiled function or stage.
+
+    Args:
+        name: Function or stage name, stages are prefixed by the function they run in, e.g. 'zero_fasts/read_csv'.
+        depth: Nesting depth, 0 for calls made from outside the package.
+        seconds: Wall time.
+        rows_in: Rows of the log passed in, None if the input has no rows (e.g. a file path).
+        rows_out: Rows of the result, None if the result has no rows.
+        peak_bytes: Peak memory allocated above the memory in use at the start, None unless memory is profiled.
+                    Before Python 3.9 (no tracemalloc.reset_peak()) a peak lower than an earlier peak of the
+                    process cannot be measured, and the memory in use at the end is recorded instead.
+    """
+    name: str
+    depth: int
+    seconds: float
+    rows_in: Optional[int]
+    rows_out: Optional[int]
+    peak_bytes: Optional[int]
+
+
+class Profile:
+    """
+    Collect a ProfileRecord for each call of a profiled function while active, see profile().
+
+    Args:
+        memory: Record memory peaks with tracemalloc, which slows down the profiled code.
+        callback: Function called with each ProfileRecord as it is recorded, e.g. to send it to a metrics system.
+    """
+
+    def __init__(self, memory: bool = False, callback: Callable[[ProfileRecord], None] = None):
+        self.memory = memory
+        self.callback = callback
+        self.records: List[ProfileRecord] = []
+
+    def record(self, record: ProfileRecord):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def report(self) -> pd.DataFrame:
+        """
+        Summarize the records by function or stage, slowest first.
+
+        Returns: pandas DataFrame indexed by name with columns 'calls', 'seconds', 'rows_in', 'rows_out'
+                 and 'peak_mib' (largest peak of a single call).
+        """
+        records = pd.DataFrame(self.records, columns=ProfileRecord._fields)
+        report = records.groupby('name', sort=False).agg(calls=('seconds', 'size'),
+                                                         seconds=('seconds', 'sum'),
+                                                         rows_in=('rows_in', 'sum'),
+                                                         rows_out=('rows_out', 'sum'),
+                                                         peak_mib=('peak_bytes', 'max'))
+        report['peak_mib'] = report.peak_mib / 2 ** 20
+        return report.sort_values('seconds', ascending=False)
+
+
+# Active profiles, empty when profiling is disabled, and the running stages of the current thread or task
+_profiles: List[Profile] = []
+_stack: contextvars.ContextVar = contextvars.ContextVar('stack', default=())
+
+# Python 3.9+: the peak of each stage is measured by resetting the peak at the start of the stage
+_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+@contextlib.contextmanager
+def profile(memory: bool = False, callback: Callable[[ProfileRecord], None] = None):
+    """
+    Profile the quantify functions called within the context.
+
+    Example:
+        with profiling.profile() as run:
+            fasts = quantify.zero_fasts('zero_export.csv')
+            quantify.daily_cumulative_hours(fasts, discrete=True)
+        print(run.report())
+
+    Args:
+        memory: Record memory peaks with tracemalloc, which slows down the profiled code.
+        callback: Function called with each ProfileRecord as it is recorded.
+
+    Returns: Profile with the records of the calls made within the context.
+    """
+    run = Profile(memory=memory, callback=callback)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    _profiles.append(run)
+    try:
+        yield run
+    finally:
+        _profiles.remove(run)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def stage(name: str, rows_in: Optional[int] = None):
+    """
+    Profile a stage of a function, e.g. parsing within zero_fasts(). Does nothing when profiling is disabled.
+
+    Args:
+        name: Name of the stage, prefixed by the name of the running function or stage.
+        rows_in: Rows processed by the stage.
+
+    Returns: A list to append the stage's result to, so its rows are recorded.
+    """
+    if not _profiles:
+        yield []
+        return
+
+    stack: Tuple[list, ...] = _stack.get()
+    if stack:
+        name = f'{stack[-1][0]}/{name}'
+    memory = tracemalloc.is_tracing()
+    current = peak = 0
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # Keep the running peak of the enclosing stage, only its memory in use is known before Python 3.9
+            stack[-1][1] = max(stack[-1][1], peak if _RESET_PEAK else current)
+        if _RESET_PEAK:
+            tracemalloc.reset_peak()
+    # name, running peak of nested stages, memory in use at the start, peak of the process at the start
+    running = [name, 0, current, peak]
+    token = _stack.set(stack + (running,))
+    result = []
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        seconds = time.perf_counter() - started
+        _stack.reset(token)
+        peak_bytes = None
+        if memory:
+            peak = max(_stage_peak(running[3]), running[1], current)
+            peak_bytes = peak - current
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+        rows_out = _rows(result[0]) if result else None
+        record = ProfileRecord(name, len(stack), seconds, rows_in, rows_out, peak_bytes)
+        for run in _profiles:
+            run.record(record)
+
+
+def _stage_peak(process_peak: int) -> int:
+    """
+    Peak memory in use since the start of a stage. Before Python 3.9 the peak of the process cannot be reset,
+    so it is only the stage's peak if the stage raised it, otherwise the memory in use now is a lower bound.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    if _RESET_PEAK or peak > process_peak:
+        return peak
+    return current
+
+
+def instrument(function: Callable) -> Callable:
+    """
+    Profile each call of a function, recording the rows of its first argument and its result.
+    When profiling is disabled the only overhead is checking for an active profile.
+
+    Args:
+        function: Function to profile.
+
+    Returns: The profiled function.
+    """
+    @functools.wraps(function)
+    def profiled(*args, **kwargs):
+        if not _profiles:
+            return function(*args, **kwargs)
+        rows_in = _rows(args[0]) if args else None
+        with stage(function.__name__, rows_in) as result:
+            result.append(function(*args, **kwargs))
+        return result[0]
+    return profiled
+
+
+def _rows(value) -> Optional[int]:
+    """Rows of a log (DataFrame, Series, FastingTimeline or array), None for anything else."""
+    if isinstance(value, (str, bytes, os.PathLike)) or not hasattr(value, '__len__'):
+        return None
+    return len(value)
+
+
+def _profile_process(setting: str):
+    """Profile the whole process, printing a report to standard error at exit."""
+    run = Profile(memory=setting.lower() == 'memory')
+    if run.memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _profiles.append(run)
+
+    def report():
+        if run.records:
+            with pd.option_context('display.width', 120, 'display.max_rows', None):
+                print(run.report(), file=sys.stderr)
+    atexit.register(report)
+
+
+if os.environ.get(PROFILE_ENV, '') not in ('', '0'):
+    _profile_process(os.environ[PROFILE_ENV])
@@ -1,70 +1,174 @@
+from typing import Iterator, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
 import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from fasting import _intervals
+from fasting import backends
+from fasting import profiling
+from fasting.timeline import FastingTimeline
+
+
+ZERO_COLUMNS = ['Date', 'Start', 'End', 'Hours', 'Night Eating']
+ZERO_DATE_FORMAT = '%m/%d/%y'
+ZERO_TIME_FORMAT = '%H:%M'
+
+# Granularities of rollup(), from the daily base aggregates
+ROLLUP_GRANULARITIES = ['day', 'week', 'month', 'iso_week', 'weekday']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Policies of repair_discrete_fasts() for overlapping fasts
+REPAIR_POLICIES = ['union', 'first', 'longest']
 
+# Default time step of continuous logs
+FREQ = '1T'
 
-def zero_fasts(zero_log_file) -> pd.DataFrame:
+# Rolling windows of adherence stats, in days
+ROLLING_WINDOWS = (7, 30, 90)
+
+# Fasting zones as used by Zero Fasting: name of each zone and the hours fasted when the zone begins
+FASTING_ZONES = {'anabolic': 0,
+                 'catabolic': 4,
+                 'fat burning': 16,
+                 'ketosis': 24,
+                 'deep ketosis': 72}
+
+
+@profiling.instrument
+def zero_fasts(zero_log_file, chunksize: Optional[int] = None, date_format: str = ZERO_DATE_FORMAT,
+               time_format: str = ZERO_TIME_FORMAT) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """
     Load a log export from Zero Fasting and return the start and end datetimes of each fast.
     DataFrame is reindexed chronologically, oldest to newest, before returned.
+    Exports concatenated into a single file (repeated header rows) are supported.
     Args:
         zero_log_file: File path of log export.
+        chunksize: Read the export this many rows at a time and return an iterator of DataFrames,
+                   so very large exports can be processed in bounded memory.
+                   Chunks are returned in file order (Zero exports newest fasts first),
+                   each chunk is ordered oldest to newest.
+        date_format: strftime format of the 'Date' column.
+        time_format: strftime format of the 'Start' and 'End' columns.
+
+    Returns: pandas DataFrame of log export, or an iterator of DataFrames if chunksize is given.
+    """
+    # Read in log as a csv, parsing is done with explicit formats in _zero_chunk_fasts()
+    with profiling.stage('read_csv'):
+        fasts = pd.read_csv(zero_log_file,
+                            header=0,
+                            dtype=str,
+                            usecols=ZERO_COLUMNS,
+                            chunksize=chunksize)
+
+    if chunksize is not None:
+        return _zero_chunks(fasts, date_format, time_format)
+    with profiling.stage('parse', rows_in=len(fasts)):
+        return _zero_chunk_fasts(fasts, date_format, time_format)
 
-    Returns: pandas DataFrame of log export.
+
+def _zero_chunks(chunks, date_format: str, time_format: str) -> Iterator[pd.DataFrame]:
+    """
+    Parse the chunks of a log export as they are read. Chunks are read and parsed after zero_fasts() returns,
+    so each is profiled as its own 'zero_fasts/read_csv' and 'zero_fasts/parse' stages.
+    """
+    while True:
+        with profiling.stage('zero_fasts/read_csv'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        with profiling.stage('zero_fasts/parse', rows_in=len(chunk)) as result:
+            result.append(_zero_chunk_fasts(chunk, date_format, time_format))
+        yield result[0]  # Outside the stage, the caller's work on the chunk is not part of it
+
+
+def _zero_chunk_fasts(fasts: pd.DataFrame, date_format: str, time_format: str) -> pd.DataFrame:
     """
-    # Read in log as a csv
-    expected_cols = ['Date', 'Start', 'End', 'Hours', 'Night Eating']
-    dtypes = {'End': str, 'Hours': float, 'Night Eating': float}
-    fasts = pd.read_csv(zero_log_file,
-                        header=0,
-                        parse_dates=[['Date', 'Start']],
-                        dtype=dtypes,
-                        usecols=expected_cols)
+    Convert rows of a Zero Fasting log export to the start and end datetimes of each completed fast.
+
+    Args:
+        fasts: DataFrame of log export rows, all columns as strings.
+        date_format: strftime format of the 'Date' column.
+        time_format: strftime format of the 'Start' and 'End' columns.
 
+    Returns: pandas DataFrame of start and end datetimes, oldest to newest.
+    """
     # Clean up DataFrame
-    fasts.dropna(subset=['Hours'], inplace=True)  # Drop incomplete fasts (Hours will be NA if incomplete)
-    fasts.rename(columns={'Date_Start': 'start_dt'}, inplace=True)  # Rename date parsed column
+    fasts = fasts[fasts.Date != 'Date']  # Drop header rows of concatenated exports
+    fasts = fasts.dropna(subset=['Hours'])  # Drop incomplete fasts (Hours will be NA if incomplete)
     fasts = fasts.iloc[::-1].reset_index(drop=True)  # Order by oldest to newest
 
-    # Get end datetime of each fast and add to fasts DataFrame as a new column: 'end_dt'
-    end_times = pd.to_datetime(fasts.End).dt.strftime('%H:%M:%S')
-    end_time_deltas = pd.to_timedelta(end_times)
-    fast_durations = pd.to_timedelta(fasts.Hours, 'H')
-    end_dates = (fasts.start_dt + fast_durations).dt.date
-    end_dt = pd.to_datetime(end_dates)
-    end_dt += end_time_deltas
-    fasts['end_dt'] = end_dt
+    start_dt = pd.to_datetime(fasts.Date + ' ' + fasts.Start, format=f'{date_format} {time_format}')
+
+    # End datetime of each fast: midnight of (start datetime + hours fasted), plus the end time of day
+    end_times = pd.to_datetime(fasts.End, format=time_format).values.view('int64')
+    fast_durations = pd.to_timedelta(pd.to_numeric(fasts.Hours), 'H').values.view('int64')
+    end_instants = start_dt.values.view('int64') + fast_durations
+    end_dt = (end_instants - end_instants % _intervals.NANOSECONDS_PER_DAY
+              + end_times % _intervals.NANOSECONDS_PER_DAY)
 
-    #  Return just the start and end datetimes of each completed fast, in descending order
-    return fasts[['start_dt', 'end_dt']]
+    #  Return just the start and end datetimes of each completed fast, in ascending order
+    return pd.DataFrame({'start_dt': start_dt, 'end_dt': end_dt.view('datetime64[ns]')})
 
 
-def validate_discrete_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt') -> bool:
+@profiling.instrument
+def validate_discrete_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt',
+                            backend: Optional[str] = None) -> bool:
     """
     Validate a discrete log of fasts for use by other module functions.
     Discrete logs should have a start and end datetime for each fast.
     Validations:
+        - Log contains at least one fast
         - Each fast has a start and end datetime (start_col and end_col cannot contain missing values)
         - Start datetimes are before end datetimes for each fast
+        - Start and end datetimes are timezone naive
         - Fasts do not overlap.
 
+    Timezone aware datetimes are rejected because days are grouped on the datetimes as int64 nanoseconds,
+    convert them first: fasts[col].dt.tz_localize(None) for wall clock time or .dt.tz_convert(None) for UTC.
+
     Args:
         fasts: DataFrame of discrete logs with start and end datetime columns.
         start_col: Name of column representing fasting start datetimes.
         end_col: Name of column representing fasting end datetimes.
+        backend: Compute backend, 'pandas' or 'numpy', see the backends module. Defaults to the global backend.
 
     Returns: True if the discrete fasts DataFrame is valid.
     """
 
-    fasts = fasts.copy()
-    fasts.sort_values(by=start_col, ascending=True, inplace=True, ignore_index=True)
-
     # TODO validate fasts[start_col] and fasts[end_col] data types
 
+    # Validate at least one fast
+    if fasts.empty:
+        raise ValueError("""
+                        Discrete logs must contain at least one fast.
+                        """)
+
+    # Validate timezone naive datetimes
+    aware_cols = [col for col in [start_col, end_col] if getattr(fasts[col].dtype, 'tz', None) is not None]
+    if aware_cols:
+        raise ValueError(f"""
+                        Discrete logs must contain timezone naive datetimes.
+                        Columns {aware_cols} are timezone aware, convert with .dt.tz_localize(None) for wall clock
+                        time or .dt.tz_convert(None) for UTC.
+                        """)
+
+    # The numpy backend checks the int64 datetimes and returns early if valid,
+    # otherwise the checks below find the same problem and raise it with the offending fasts
+    if backends.resolve(backend) == 'numpy':
+        problem, _ = backends.discrete_problems(fasts[start_col].values.astype('datetime64[ns]').view('int64'),
+                                                fasts[end_col].values.astype('datetime64[ns]').view('int64'))
+        if problem is None:
+            return True
+
+    # Single pass checks over the start and end datetime arrays, the DataFrame is not copied or sorted
+    starts = fasts[start_col].values
+    ends = fasts[end_col].values
+
     # Validate no missing start or end datetimes
-    start_end = fasts[[start_col, end_col]]
-    if start_end.isnull().values.any():
-        nan_rows = start_end.isnull().any(axis=1)
-        nan_rows_indexes = nan_rows[nan_rows].index
-        nan_fasts = fasts.iloc[nan_rows_indexes, :]
+    nan_rows = pd.isnull(starts) | pd.isnull(ends)
+    if nan_rows.any():
+        nan_fasts = fasts[nan_rows]
         raise ValueError(f"""
                         Discrete logs must contain start and end datetimes.
                         Check columns '{start_col}' and '{end_col}' for missing values:
@@ -72,7 +176,7 @@ def validate_discrete_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', en
                         """)
 
     # validate start_dt < end_dt
-    start_end_mismatch = fasts[start_col] > fasts[end_col]  # Is start datetime AFTER end datetime?
+    start_end_mismatch = starts > ends  # Is start datetime AFTER end datetime?
     if start_end_mismatch.any():  # If any mismatch
         conflicting_logs = fasts[start_end_mismatch]  # Subset fasts with start and end mismatch
         raise ValueError(f"""
@@ -81,14 +185,17 @@ def validate_discrete_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', en
                         {conflicting_logs}
                         """)
 
-    # Validate no overlapping fasts
-    intervals = pd.IntervalIndex.from_arrays(left=fasts.start_dt, right=fasts.end_dt.values)
-    if intervals.is_overlapping:
-        # get overlapping fasts
-        previous_end_dt = fasts[end_col].shift(1).dropna()
-        overlapping = previous_end_dt > fasts[start_col][1:]
-        true_overlap = overlapping[overlapping]
-        overlapping_fasts = fasts.iloc[true_overlap.index]
+    # Validate no overlapping fasts, sorting by start datetime only if the log is not already in order
+    order = None
+    if not (starts[1:] >= starts[:-1]).all():
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+    overlapping = ends[:-1] > starts[1:]  # Does a fast start before the previous fast ends?
+    if overlapping.any():
+        overlapping_rows = np.flatnonzero(overlapping) + 1
+        if order is not None:
+            overlapping_rows = order[overlapping_rows]
+        overlapping_fasts = fasts.iloc[overlapping_rows]
         raise ValueError(f"""
                         Overlapping fasts found in DataFrame.
                         The following fasts overlap with previous fast:
@@ -98,29 +205,153 @@ def validate_discrete_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', en
     return True
 
 
-def validate_continuous_fasts(fasts: pd.Series) -> bool:
+@profiling.instrument
+def repair_discrete_fasts(fasts: pd.DataFrame, policy: str = 'union', start_col: str = 'start_dt',
+                          end_col: str = 'end_dt') -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Repair a discrete log that fails validate_discrete_fasts(), e.g. logs merged from several devices or
+    re-imported exports. Fasts are sorted once and swept in start order, O(n log n) for n fasts.
+    Repairs:
+        - Fasts with a missing start or end datetime, or with the start after the end, are dropped.
+        - Overlapping fasts (including duplicates) are resolved by policy:
+            - 'union': Overlapping and touching fasts are merged into one fast from the earliest start
+              to the latest end.
+            - 'first': Of each group of overlapping fasts, the fast that starts first is kept.
+            - 'longest': Of each group of overlapping fasts, the longest fast is kept.
+          A group is every fast chained together by overlaps, so one fast is kept per group.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        policy: How overlapping fasts are resolved, one of REPAIR_POLICIES.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+
+    Returns: Tuple of pandas DataFrames (repaired, report)
+                - repaired: Valid discrete log of start and end datetimes, oldest to newest.
+                - report: A row for every fast that was changed, with columns:
+                    - 'row': Index label of the fast in the input log.
+                    - 'action': 'dropped' or 'merged'.
+                    - 'reason': 'missing', 'start after end', 'duplicate' (same start and end datetimes as the
+                      repaired fast) or 'overlap' (overlapping, or touching with the 'union' policy).
+                    - start_col and end_col: Start and end datetime of the fast in the input log.
+                    - 'fast': Position of the repaired fast that replaced it, -1 if none.
+    """
+    if policy not in REPAIR_POLICIES:
+        raise ValueError(f"""
+                        Unknown repair policy: {policy}.
+                        Policy must be one of: {REPAIR_POLICIES}.
+                        """)
+
+    starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+    ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+    missing = pd.isnull(fasts[start_col].values) | pd.isnull(fasts[end_col].values)
+    inverted = ~missing & (starts > ends)
+
+    # Sort the remaining fasts by start datetime, keeping input order for fasts starting at the same time
+    rows = np.flatnonzero(~missing & ~inverted)
+    rows = rows[np.argsort(starts[rows], kind='stable')]
+    starts, ends = starts[rows], ends[rows]
+
+    # Sweep: a fast starts a new group if it starts after every previous fast ended (union: at or after)
+    latest_end = np.maximum.accumulate(ends)
+    if policy == 'union':
+        new_group = starts[1:] > latest_end[:-1]
+    else:
+        new_group = starts[1:] >= latest_end[:-1]
+    group = np.concatenate([[0], np.cumsum(new_group)]) if len(rows) else np.zeros(0, dtype='int64')
+    group_firsts = np.flatnonzero(np.concatenate([[True], new_group])) if len(rows) else group
+
+    if policy == 'union':
+        repaired_starts = starts[group_firsts]
+        repaired_ends = np.maximum.reduceat(ends, group_firsts) if len(rows) else ends
+        kept = np.zeros(len(rows), dtype=bool)
+        kept[group_firsts] = np.diff(np.append(group_firsts, len(rows))) == 1  # Fasts not merged with any other
+    else:
+        if policy == 'first':
+            keep = group_firsts
+        else:
+            # Longest fast of each group, the first of equally long fasts
+            order = np.lexsort((np.arange(len(rows)), starts - ends, group))
+            keep = order[np.flatnonzero(np.diff(np.concatenate([[-1], group[order]])))]
+        repaired_starts, repaired_ends = starts[keep], ends[keep]
+        kept = np.zeros(len(rows), dtype=bool)
+        kept[keep] = True
+
+    # Report every dropped or merged fast
+    changed = ~kept
+    kept_start, kept_end = repaired_starts[group[changed]], repaired_ends[group[changed]]
+    duplicate = (starts[changed] == kept_start) & (ends[changed] == kept_end)
+    report = pd.DataFrame({'row': np.concatenate([np.flatnonzero(missing), np.flatnonzero(inverted),
+                                                  rows[changed]]),
+                           'action': (['dropped'] * int(missing.sum() + inverted.sum())
+                                      + ['merged' if policy == 'union' else 'dropped'] * int(changed.sum())),
+                           'reason': (['missing'] * int(missing.sum()) + ['start after end'] * int(inverted.sum())
+                                      + np.where(duplicate, 'duplicate', 'overlap').tolist()),
+                           'fast': np.concatenate([np.full(int(missing.sum() + inverted.sum()), -1),
+                                                   group[changed]])})
+    report = report.sort_values('row', ignore_index=True)
+    report.insert(3, start_col, fasts[start_col].iloc[report.row].values)
+    report.insert(4, end_col, fasts[end_col].iloc[report.row].values)
+    report['row'] = fasts.index[report.row]
+
+    repaired = pd.DataFrame({start_col: repaired_starts.view('datetime64[ns]'),
+                             end_col: repaired_ends.view('datetime64[ns]')})
+    return repaired, report
+
+
+@profiling.instrument
+def validate_continuous_fasts(fasts: Union[pd.Series, FastingTimeline], freq: str = FREQ) -> bool:
     """
     Validate a continuous log of fasts for use by other module functions.
     Validations:
-        - Frequency of series index is 1 minute ('T')
+        - Frequency of series index is freq, 1 minute ('T') by default
         - Value at each time step is either 0 or 1 (0 ~ not fasting, 1 ~ fasting), no extraneous or NaN values
 
     Args:
-        fasts: Series of continuous logs with a datetime index at a 1 minute frequency and values of 0 or 1.
+        fasts: Series of continuous logs with a datetime index at a frequency of freq and values of 0 or 1,
+               or a FastingTimeline at a frequency of freq.
+        freq: Expected frequency of the continuous log, default 1 minute.
 
     Returns: True if the fasts series is valid.
     """
+    expected_freq = to_offset(freq)
+
+    # A FastingTimeline only holds fasting runs, so values are valid by construction
+    if isinstance(fasts, FastingTimeline):
+        if fasts.freq != expected_freq:
+            raise ValueError(f"""
+                            Frequency of the continuous fast must be: '{expected_freq.freqstr}'.
+                            Frequency of fasts timeline input: {fasts.freq.freqstr}.
+                            """)
+        return True
 
-    # Validate frequency of index is 1 minute ('T')
-    freq = pd.infer_freq(fasts.index)
-    if freq != 'T':
+    # Validate frequency of index, from the index frequency or a single pass over the index steps
+    index = fasts.index
+    if not isinstance(index, pd.DatetimeIndex):
+        valid_freq = False
+    elif index.freq is not None:
+        valid_freq = index.freq == expected_freq
+    else:
+        valid_freq = bool((np.diff(index.asi8) == expected_freq.nanos).all())
+    if not valid_freq:
+        try:
+            freq = pd.infer_freq(index)
+        except (TypeError, ValueError):
+            freq = None
         raise ValueError(f"""
-                        Frequency of the continuous fast must be: 'T' (1 minute).
+                        Frequency of the continuous fast must be: '{expected_freq.freqstr}'.
                         Frequency of fasts series input: {freq}.
                         """)
 
-    # Validate values only contain 0 or 1
-    if not fasts.isin([0, 1]).all():
+    # Validate values only contain 0 or 1, in a single pass suited to the values data type
+    values = fasts.to_numpy()
+    if values.dtype == bool or not len(values):
+        valid_values = True
+    elif values.dtype.kind in 'iu':
+        valid_values = values.min() >= 0 and values.max() <= 1
+    else:
+        valid_values = ((values == 0) | (values == 1)).all()  # NaN is neither 0 or 1
+    if not valid_values:
         unexpected_values = fasts[((fasts != 0) & (fasts != 1))]
         raise ValueError(f"""
                         Continuous fast (input to fasts) must contain only values of 0 or 1.
@@ -131,67 +362,131 @@ def validate_continuous_fasts(fasts: pd.Series) -> bool:
     return True
 
 
-def continuous_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt') -> pd.Series:
+@profiling.instrument
+def continuous_fasts(fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt',
+                     compact: bool = False, validate: bool = True, freq: str = FREQ,
+                     backend: Optional[str] = None) -> Union[pd.Series, FastingTimeline]:
     """
     Create a continuous time series of fasting status (0 ~ no or 1 ~ yes)
     from a DataFrame of individual events (start datetime and end datetime)
     with a datetime index at a frequency of 1 minute.
 
+    Time steps start at the start datetime of the first fast and end at or before the end datetime of the last fast.
+    Partial time steps: a time step is fasting (1) if its timestamp falls within a fast, start and end datetimes
+    inclusive, and then counts as a whole time step of fasting. With the default 1 minute frequency this means the
+    start and end minute of a fast are both fasting. Coarser frequencies use less memory at the cost of rounding
+    each fast to whole time steps.
+
     Args:
         fasts: DataFrame of discrete logs with start and end datetime columns.
         start_col: Name of column representing fasting start datetimes.
         end_col: Name of column representing fasting end datetimes.
+        compact: Return a run-length encoded FastingTimeline instead of a pandas Series.
+        validate: Validate the discrete log first, see validate_discrete_fasts().
+                  Pass False for a log that was already validated, e.g. when chaining calls.
+        freq: Length of a time step, default 1 minute. e.g. '15T' for 15 minutes or '30S' for 30 seconds.
+        backend: Compute backend, 'pandas' or 'numpy', see the backends module. Defaults to the global backend.
+                 The compact timeline is always built from int64 arrays.
 
-    Returns: A pandas Series of event status at 1 minute frequency.
+    Returns: A pandas Series of event status at a frequency of freq.
                 - Yes (ie. fasting) as 1.
                 - No (i.e. not fasting) as 0.
 
     """
-    if not validate_discrete_fasts(fasts, 'start_dt', 'end_dt'):
+    backend = backends.resolve(backend)
+    if validate and not validate_discrete_fasts(fasts, start_col, end_col, backend=backend):
         raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
 
-    # Sort by start_dt (oldest to newest)
-    fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+    if compact:
+        return FastingTimeline.from_discrete(fasts, start_col, end_col, freq=freq)
+
+    if backend == 'numpy':
+        with profiling.stage('fill', rows_in=len(fasts)):
+            origin, status = backends.continuous_status(fasts[start_col].values.astype('datetime64[ns]').view('int64'),
+                                                        fasts[end_col].values.astype('datetime64[ns]').view('int64'),
+                                                        to_offset(freq).nanos)
+        time_range = pd.date_range(start=pd.Timestamp(origin), periods=len(status), freq=freq)
+        return pd.Series(status, index=time_range)
+
+    # Sort by start_dt (oldest to newest), unless already in order
+    if not fasts[start_col].is_monotonic_increasing:
+        fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
 
     # Create continuous log
     start = fasts[start_col].iloc[0]  # First timestamp: start_dt of first fast
     end = fasts[end_col].iloc[-1]  # Last timestamp: end_dt of last fast
-    time_range = pd.date_range(start=start, end=end, freq='1T')
-    log = pd.Series(0, index=time_range)  # Initialize continuous log to 0
-    for index, row in fasts.iterrows():  # Set fasting value to 1 for timestamps between fast start and end
-        start = row[start_col]
-        end = row[end_col]
-        log[start:end] = 1
+    with profiling.stage('date_range'):
+        time_range = pd.date_range(start=start, end=end, freq=freq)
+
+    with profiling.stage('fill', rows_in=len(fasts)):
+        # Locate every fast in the index at once, end timestamps inclusive (same as a label slice)
+        first_steps = time_range.searchsorted(fasts[start_col].values, side='left')
+        last_steps = time_range.searchsorted(fasts[end_col].values, side='right')
 
+        # Mark +1 where each fast begins and -1 just after it ends, then a cumulative sum fills the fasts in one pass
+        boundaries = np.zeros(len(time_range) + 1, dtype='int64')
+        np.add.at(boundaries, first_steps, 1)
+        np.add.at(boundaries, last_steps, -1)
+        status = (np.cumsum(boundaries[:-1]) > 0).astype('int64')
+
+    log = pd.Series(status, index=time_range)
     return log
 
 
-def daily_cumulative_hours(fasts: pd.Series) -> pd.Series:
+@profiling.instrument
+def daily_cumulative_hours(fasts: Union[pd.Series, FastingTimeline, pd.DataFrame], discrete: bool = False,
+                           start_col: str = 'start_dt', end_col: str = 'end_dt', validate: bool = True,
+                           freq: str = FREQ, backend: Optional[str] = None) -> pd.Series:
     """
     Calculate the daily cumulative hours fasted from a pandas Series of fasting status with 1 minute frequency.
     Args:
         fasts: pandas Series of fasting status with 1 minute frequency.
                     - Yes (ie. fasting) as 1.
                     - No (i.e. not fasting) as 0.
+               Or a FastingTimeline with 1 minute frequency.
+               Or, if discrete is True, a DataFrame of discrete logs with start and end datetime columns.
+        discrete: Calculate directly from a discrete log, without creating the continuous log.
+                  Results are identical to daily_cumulative_hours(continuous_fasts(fasts)).
+        start_col: Name of column representing fasting start datetimes (discrete only).
+        end_col: Name of column representing fasting end datetimes (discrete only).
+        validate: Validate the log first, see validate_continuous_fasts() and validate_discrete_fasts().
+                  Pass False for a log that was already validated, e.g. when chaining calls.
+        freq: Frequency of the continuous log, default 1 minute. Time steps are scaled to hours by their length.
+        backend: Compute backend for a pandas Series, 'pandas' (resample) or 'numpy' (int64 arrays),
+                 see the backends module. Defaults to the global backend.
     Returns: The daily cumulative hours fasted as a pandas Series.
 
     """
-    if not validate_continuous_fasts(fasts):
+    backend = backends.resolve(backend)
+    if discrete:
+        fasts = continuous_fasts(fasts, start_col, end_col, compact=True, validate=validate, freq=freq,
+                                 backend=backend)
+
+    if validate and not validate_continuous_fasts(fasts, freq):
         raise Exception('Continuous log is invalid. Check error raised by validate_continuous_log().')
 
     minutes_per_hour = 60
-    cumulative_mins = fasts.resample('1D').sum()
+    if isinstance(fasts, FastingTimeline):
+        cumulative_steps = fasts.daily_sum()
+    elif backend == 'numpy' and len(fasts) and fasts.index.tz is None:  # Days of naive datetimes only
+        cumulative_steps = _numpy_daily_steps(fasts, freq)[0]
+    else:
+        with profiling.stage('resample', rows_in=len(fasts)):
+            cumulative_steps = fasts.resample('1D').sum()
+    cumulative_mins = cumulative_steps * _step_minutes(freq)
     cumulative_hrs = cumulative_mins / minutes_per_hour
     return cumulative_hrs
 
 
-def consecutive_minutes(fasts: pd.Series) -> pd.Series:
+@profiling.instrument
+def consecutive_minutes(fasts: Union[pd.Series, FastingTimeline], validate: bool = True,
+                        freq: str = FREQ) -> pd.Series:
     """
     Create a time series of consecutive minutes (cumulative summation of each fast) fasted from
     a time series of fasting status.
 
-    Credit to George Pipis for inspiration of the solution.
-    You can find George's solution [here](https://predictivehacks.com/count-the-consecutive-events-in-python/)
+    Runs of fasting are found once from the changes in status, so the cost is a few passes over the
+    series rather than a groupby over every minute.
 
     Example:
         Input =  [0,1,1,1,0,1,1]
@@ -201,18 +496,28 @@ def consecutive_minutes(fasts: pd.Series) -> pd.Series:
         fasts: pandas Series of fasting status with 1 minute frequency.
                     - Yes (ie. fasting) as 1.
                     - No (i.e. not fasting) as 0.
+               Or a FastingTimeline with 1 minute frequency.
+        validate: Validate the continuous log first, see validate_continuous_fasts().
+                  Pass False for a log that was already validated, e.g. when chaining calls.
+        freq: Frequency of the continuous log, default 1 minute. Time steps are scaled to minutes by their length.
     Returns: A time series of a consecutive minutes fasted.
     """
 
-    if not validate_continuous_fasts(fasts):
+    if validate and not validate_continuous_fasts(fasts, freq):
         raise Exception('Continuous log is invalid. Check error raised by validate_continuous_log().')
 
-    consecutive_mins = fasts.groupby((fasts != fasts.shift()).cumsum()).cumcount() + 1
-    consecutive_mins[fasts == 0] = 0
-    return consecutive_mins
+    if isinstance(fasts, FastingTimeline):
+        consecutive_steps = fasts.consecutive()
+    else:
+        # Run-length engine: find the start and end of each run of fasting, then count up with one cumulative sum
+        consecutive_steps = pd.Series(backends.consecutive_steps(fasts.to_numpy(dtype='int64')), index=fasts.index)
+    return consecutive_steps * _step_minutes(freq)
 
 
-def daily_max_consecutive_hours(fasts: pd.Series) -> pd.Series:
+@profiling.instrument
+def daily_max_consecutive_hours(fasts: Union[pd.Series, FastingTimeline, pd.DataFrame], discrete: bool = False,
+                                start_col: str = 'start_dt', end_col: str = 'end_dt',
+                                validate: bool = True, freq: str = FREQ, backend: Optional[str] = None) -> pd.Series:
     """
     Calculate the maximum daily consecutive hours fasted from a pandas Series of fasting status with 1 minute frequency.
 
@@ -224,21 +529,521 @@ def daily_max_consecutive_hours(fasts: pd.Series) -> pd.Series:
         fasts: pandas Series of fasting status with 1 minute frequency.
                     - Yes (ie. fasting) as 1.
                     - No (i.e. not fasting) as 0.
+               Or a FastingTimeline with 1 minute frequency.
+               Or, if discrete is True, a DataFrame of discrete logs with start and end datetime columns.
+        discrete: Calculate directly from a discrete log, without creating the continuous log.
+                  Results are identical to daily_max_consecutive_hours(continuous_fasts(fasts)).
+        start_col: Name of column representing fasting start datetimes (discrete only).
+        end_col: Name of column representing fasting end datetimes (discrete only).
+        validate: Validate the log first, see validate_continuous_fasts() and validate_discrete_fasts().
+                  Pass False for a log that was already validated, e.g. when chaining calls.
+        freq: Frequency of the continuous log, default 1 minute. Time steps are scaled to hours by their length.
+        backend: Compute backend for a pandas Series, 'pandas' (resample) or 'numpy' (int64 arrays),
+                 see the backends module. Defaults to the global backend.
     Returns: The daily maximum consecutive hours fasted as a pandas Series.
 
     """
+    backend = backends.resolve(backend)
+    if discrete:
+        fasts = continuous_fasts(fasts, start_col, end_col, compact=True, validate=validate, freq=freq,
+                                 backend=backend)
 
-    if not validate_continuous_fasts(fasts):
+    if validate and not validate_continuous_fasts(fasts, freq):
         raise Exception('Continuous log is invalid. Check error raised by validate_continuous_log().')
 
     minutes_per_hour = 60
-    consecutive_mins = consecutive_minutes(fasts)
-    daily_maximum_mins = consecutive_mins.resample('1D').max()
+    if isinstance(fasts, FastingTimeline):
+        daily_maximum_mins = fasts.daily_max_consecutive() * _step_minutes(freq)
+    elif backend == 'numpy' and len(fasts) and fasts.index.tz is None:  # Days of naive datetimes only
+        daily_maximum_mins = _numpy_daily_steps(fasts, freq)[1] * _step_minutes(freq)
+    else:
+        consecutive_mins = consecutive_minutes(fasts, validate=False, freq=freq)  # Validated above
+        with profiling.stage('resample', rows_in=len(consecutive_mins)):
+            daily_maximum_mins = consecutive_mins.resample('1D').max()
     daily_maximum_hrs = daily_maximum_mins / minutes_per_hour
     return daily_maximum_hrs
 
-# TODO fast_durations() -> calculate duration of each fast
-# TODO fasting_zone() -> label each time step in a continuous log with the associated fasting zone
-# TODO summary() -> input discrete log and get all stats back
-# TODO add 'discrete:bool=False' parameter to most functions?
-#  So users can go direct from discrete log to stats and csv to either discrete or continuous when loading log
+
+@profiling.instrument
+def fast_durations(fasts: Union[pd.DataFrame, pd.Series, FastingTimeline], discrete: bool = False,
+                   start_col: str = 'start_dt', end_col: str = 'end_dt', validate: bool = True,
+                   freq: str = FREQ) -> pd.DataFrame:
+    """
+    Calculate the duration of each fast, from either a discrete or a continuous log.
+
+    From a continuous log, each run of consecutive fasting minutes is one fast, starting at its first fasting minute
+    and ending at its last. Back to back fasts (no minute of not fasting in between) can not be told apart
+    in a continuous log and are combined into a single fast.
+
+    Args:
+        fasts: pandas Series of fasting status with 1 minute frequency, or a FastingTimeline.
+                    - Yes (ie. fasting) as 1.
+                    - No (i.e. not fasting) as 0.
+               Or, if discrete is True, a DataFrame of discrete logs with start and end datetime columns.
+        discrete: Calculate from a discrete log.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the log first, see validate_continuous_fasts() and validate_discrete_fasts().
+                  Pass False for a log that was already validated, e.g. when chaining calls.
+        freq: Frequency of the continuous log, default 1 minute.
+
+    Returns: pandas DataFrame of the start datetime, end datetime and duration in 'hours' of each fast,
+             oldest to newest.
+    """
+    minutes_per_hour = 60
+    if discrete:
+        if validate and not validate_discrete_fasts(fasts, start_col, end_col):
+            raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+        durations = fasts[[start_col, end_col]]
+        if not durations[start_col].is_monotonic_increasing:
+            durations = durations.sort_values(by=start_col, ascending=True)
+        durations = durations.reset_index(drop=True)
+        durations['hours'] = (durations[end_col] - durations[start_col]) / pd.Timedelta(hours=1)
+        return durations
+
+    if validate and not validate_continuous_fasts(fasts, freq):
+        raise Exception('Continuous log is invalid. Check error raised by validate_continuous_log().')
+
+    if isinstance(fasts, FastingTimeline):
+        run_starts, run_ends = fasts.run_starts, fasts.run_ends
+        start_dts = fasts.start + pd.to_timedelta(run_starts * fasts.step, unit='ns')
+        end_dts = fasts.start + pd.to_timedelta(run_ends * fasts.step, unit='ns')
+    else:
+        run_starts, run_ends = _intervals.runs_from_status(fasts.to_numpy(dtype='int64'))
+        start_dts = fasts.index[run_starts]
+        end_dts = fasts.index[run_ends]
+
+    durations = pd.DataFrame({start_col: start_dts,
+                              end_col: end_dts,
+                              'hours': (run_ends - run_starts) * _step_minutes(freq) / minutes_per_hour})
+    return durations
+
+
+@profiling.instrument
+def fasting_zone(fasts: pd.DataFrame, zones: Mapping[str, float] = None, start_col: str = 'start_dt',
+                 end_col: str = 'end_dt', validate: bool = True) -> pd.DataFrame:
+    """
+    Break each fast in a discrete log into the fasting zones it reached, based on the time elapsed since the fast
+    started. Zones are calculated with interval arithmetic on each fast, so the cost scales with
+    fasts x zones rather than minutes.
+
+    Example:
+        A 20 hour fast with the default zones is anabolic for hours 0-4, catabolic for hours 4-16
+        and fat burning for hours 16-20.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        zones: Mapping of zone name to the hours fasted when the zone begins, defaults to FASTING_ZONES.
+               Each zone lasts until the next zone begins, the last zone lasts until the end of the fast.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the discrete log first, see validate_discrete_fasts().
+
+    Returns: pandas DataFrame with a row per fast per zone reached, oldest to newest:
+                - 'fast': Position of the fast in the discrete log, ordered oldest to newest.
+                - 'zone': Name of the fasting zone.
+                - start_col and end_col: Start and end datetime of the time spent in the zone.
+    """
+    if validate and not validate_discrete_fasts(fasts, start_col, end_col):
+        raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+
+    zones = FASTING_ZONES if zones is None else zones
+    zone_names, zone_starts, zone_ends = _zone_bounds(zones)
+
+    if not fasts[start_col].is_monotonic_increasing:
+        fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+    starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+    ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+
+    # Every fast x zone at once: zone boundaries are offsets from each fast's start, clipped to its end
+    zone_start_dts = np.minimum(starts[:, np.newaxis] + zone_starts, ends[:, np.newaxis])
+    zone_end_dts = np.minimum(starts[:, np.newaxis] + zone_ends, ends[:, np.newaxis])
+    reached = zone_start_dts < zone_end_dts
+    fast, zone = np.nonzero(reached)
+
+    zone_intervals = pd.DataFrame({'fast': fast,
+                                   'zone': zone_names[zone],
+                                   start_col: zone_start_dts[reached].view('datetime64[ns]'),
+                                   end_col: zone_end_dts[reached].view('datetime64[ns]')})
+    return zone_intervals
+
+
+@profiling.instrument
+def daily_zone_minutes(fasts: pd.DataFrame, zones: Mapping[str, float] = None, start_col: str = 'start_dt',
+                       end_col: str = 'end_dt', validate: bool = True) -> pd.DataFrame:
+    """
+    Calculate the minutes spent in each fasting zone each day from a discrete log, see fasting_zone().
+    Time spent in a zone is split at midnight, without creating the continuous log.
+    Minutes are elapsed time (end datetime exclusive), so a day's total is the time fasted that day.
+    Days are split at midnight of the naive datetimes, timezone aware logs are rejected by validation.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        zones: Mapping of zone name to the hours fasted when the zone begins, defaults to FASTING_ZONES.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the discrete log first, see validate_discrete_fasts().
+
+    Returns: pandas DataFrame of minutes in each zone (columns) each day (index),
+             from the day of the first start to the day of the last end datetime.
+    """
+    zones = FASTING_ZONES if zones is None else zones
+    zone_intervals = fasting_zone(fasts, zones, start_col, end_col, validate=validate)
+    zone_names = _zone_bounds(zones)[0]
+
+    starts = zone_intervals[start_col].values.view('int64')
+    ends = zone_intervals[end_col].values.view('int64')
+    interval, day, piece_starts, piece_ends = _intervals.split_at_midnight(starts, ends)
+
+    # Accumulate nanoseconds per day and zone, days span the whole log even if no zone was reached
+    first_day = fasts[start_col].min().normalize()
+    days = pd.date_range(start=first_day, end=fasts[end_col].max().normalize(), freq='1D')
+    zone_positions = pd.Index(zone_names).get_indexer(zone_intervals.zone.values)
+    day_positions = (day - first_day.value) // _intervals.NANOSECONDS_PER_DAY
+    zone_nanoseconds = np.zeros((len(days), len(zone_names)), dtype='int64')
+    np.add.at(zone_nanoseconds, (day_positions, zone_positions[interval]), piece_ends - piece_starts)
+
+    return pd.DataFrame(zone_nanoseconds / _intervals.NANOSECONDS_PER_MINUTE, index=days, columns=zone_names)
+
+
+def _zone_bounds(zones: Mapping[str, float]):
+    """Zone names, and start and end of each zone as nanoseconds since the start of a fast, ordered by start."""
+    zones = sorted(zones.items(), key=lambda zone: zone[1])
+    zone_names = np.array([name for name, _ in zones], dtype=object)
+    zone_starts = np.array([pd.Timedelta(hours=hours).value for _, hours in zones], dtype='int64')
+    zone_ends = np.append(zone_starts[1:], np.iinfo('int64').max // 2)  # Last zone lasts until the fast ends
+    return zone_names, zone_starts, zone_ends
+
+
+@profiling.instrument
+def fasting_state(fasts: pd.DataFrame, timestamps, start_col: str = 'start_dt', end_col: str = 'end_dt',
+                  validate: bool = True) -> pd.DataFrame:
+    """
+    Align fasting state to arbitrary timestamps, e.g. the irregular readings of a continuous glucose monitor.
+    Each timestamp is located with a binary search over the fast start and end datetimes, in O(m log n) time
+    for m timestamps and n fasts, without creating the continuous log.
+    A timestamp is fasting if it falls within a fast, start and end datetimes inclusive, the same rule as
+    continuous_fasts(). A timestamp at the end of one fast and the start of the next belongs to the later fast.
+
+    Example:
+        readings = pd.read_csv('cgm.csv', parse_dates=['time'])
+        state = fasting_state(fasts, readings.time)
+        readings = readings.join(state.reset_index(drop=True))
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        timestamps: Datetimes to align to, in any order, e.g. a DatetimeIndex or datetime Series.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the discrete log first, see validate_discrete_fasts().
+
+    Returns: pandas DataFrame indexed by the timestamps, in the order given, with columns:
+                - 'fasting': Fasting status, 1 if fasting, else 0.
+                - 'elapsed_minutes': Minutes since the start of the fast, 0 if not fasting.
+                - 'fast': Position of the fast in the discrete log, ordered oldest to newest, -1 if not fasting.
+    """
+    if validate and not validate_discrete_fasts(fasts, start_col, end_col):
+        raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+
+    if not fasts[start_col].is_monotonic_increasing:
+        fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+    starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+    ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+
+    index = pd.DatetimeIndex(timestamps)
+    points = index.asi8
+    fast = _intervals.containing_interval(starts, ends, points)
+    fasting = fast >= 0
+    elapsed = np.where(fasting, points - starts[fast], 0)  # fast of -1 reads the last start, masked out
+    return pd.DataFrame({'fasting': fasting.astype('int64'),
+                         'elapsed_minutes': elapsed / _intervals.NANOSECONDS_PER_MINUTE,
+                         'fast': fast}, index=index)
+
+
+class FastingSummary(NamedTuple):
+    """
+    All fasting stats of a discrete log, as returned by summary().
+
+    Attributes:
+        durations: Start datetime, end datetime and duration in 'hours' of each fast, see fast_durations().
+        daily: Daily 'cumulative_hours' and 'max_consecutive_hours' fasted,
+               see daily_cumulative_hours() and daily_max_consecutive_hours().
+        stats: Totals and averages over the whole log, see summary() for how hours are counted.
+    """
+    durations: pd.DataFrame
+    daily: pd.DataFrame
+    stats: pd.Series
+
+
+@profiling.instrument
+def summary(fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt',
+            validate: bool = True, freq: str = FREQ) -> FastingSummary:
+    """
+    Calculate all fasting stats from a discrete log in one call.
+    The log is validated and sorted once and the runs of fasting minutes and their midnight splits are calculated once,
+    then shared by every stat, instead of creating the continuous log for each one.
+
+    Stats of fasts are elapsed time (end - start, like fast_durations()), while daily stats count fasting time steps
+    of the continuous log, start and end inclusive (like daily_cumulative_hours()). So 'total_hours' is less than
+    the sum of the daily cumulative hours, by one time step for each fast (e.g. a fast from 20:00 to 12:00 is
+    16 hours, and 16 hours and 1 minute of daily cumulative hours), less when fasts are back to back or off the
+    time step grid.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the discrete log first, see validate_discrete_fasts().
+        freq: Length of a time step for the daily metrics, see continuous_fasts().
+
+    Returns: FastingSummary of per fast durations, daily metrics and stats:
+                - 'fasts': Number of fasts.
+                - 'days': Number of days from the first to the last fast.
+                - 'total_hours': Total elapsed hours fasted, the sum of the fast durations.
+                - 'average_fast_hours': Average duration of a fast.
+                - 'longest_fast_hours': Duration of the longest fast.
+                - 'average_cumulative_hours': Average daily cumulative hours fasted.
+                - 'average_max_consecutive_hours': Average daily maximum consecutive hours fasted.
+    """
+    if validate and not validate_discrete_fasts(fasts, start_col, end_col):
+        raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+
+    if not fasts[start_col].is_monotonic_increasing:
+        fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+
+    minutes_per_hour = 60
+    durations = fast_durations(fasts, discrete=True, start_col=start_col, end_col=end_col, validate=False)
+    timeline = continuous_fasts(fasts, start_col, end_col, compact=True, validate=False, freq=freq)
+    daily = timeline.daily() * _step_minutes(freq) / minutes_per_hour
+    daily.columns = ['cumulative_hours', 'max_consecutive_hours']
+
+    stats = pd.Series({'fasts': len(durations),
+                       'days': len(daily),
+                       'total_hours': durations.hours.sum(),
+                       'average_fast_hours': durations.hours.mean(),
+                       'longest_fast_hours': durations.hours.max(),
+                       'average_cumulative_hours': daily.cumulative_hours.mean(),
+                       'average_max_consecutive_hours': daily.max_consecutive_hours.mean()})
+    return FastingSummary(durations=durations, daily=daily, stats=stats)
+
+
+@profiling.instrument
+def rolling_adherence(fasts: pd.DataFrame, windows=ROLLING_WINDOWS, goal_hours: float = 16,
+                      start_col: str = 'start_dt', end_col: str = 'end_dt', validate: bool = True) -> pd.DataFrame:
+    """
+    Calculate rolling adherence stats over trailing windows of days from a discrete log.
+    The daily metrics are calculated once (see summary()), then every window is one prefix sum pass,
+    so the cost does not grow with the window length or the number of windows.
+    Windows at the start of the log cover the days available.
+
+    Example:
+        A window of 7 days on 1/14/21 covers 1/8/21 through 1/14/21.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        windows: Window lengths in days, defaults to ROLLING_WINDOWS.
+        goal_hours: A day meets the goal if its maximum consecutive hours fasted are at least goal_hours.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the discrete log first, see validate_discrete_fasts().
+
+    Returns: pandas DataFrame indexed by day with columns for each window of N days:
+                - 'average_hours_Nd': Average daily cumulative hours fasted.
+                - 'goal_share_Nd': Share of days meeting the goal.
+                - 'longest_streak_Nd': Most consecutive days meeting the goal.
+                - 'eating_start_Nd', 'eating_end_Nd': Average start and end of the eating window, in hours after
+                  midnight of the day it starts. An eating window is the time between the end of a fast and
+                  the start of the next, the earliest start and latest end of a day make up the day's window.
+                  NaN if there is no eating window in the trailing days.
+    """
+    if validate and not validate_discrete_fasts(fasts, start_col, end_col):
+        raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+
+    if not fasts[start_col].is_monotonic_increasing:
+        fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+    starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+    ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+
+    minutes_per_hour = 60
+    daily = continuous_fasts(fasts, start_col, end_col, compact=True, validate=False).daily()
+    days = len(daily)
+    goal_met = (daily.max_consecutive.values >= goal_hours * minutes_per_hour).astype('int64')
+    goal_starts, goal_ends = _intervals.runs_from_status(goal_met)
+    eating_start, eating_end = _daily_eating_windows(starts, ends, daily.index[0].value, days)
+    has_eating = ~np.isnan(eating_start)
+
+    stats = {}
+    for window in windows:
+        day_count = _intervals.trailing_sums(np.ones(days, dtype='int64'), window)
+        eating_days = _intervals.trailing_sums(has_eating, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats[f'average_hours_{window}d'] = (_intervals.trailing_sums(daily.cumulative.values, window)
+                                                 / day_count / minutes_per_hour)
+            stats[f'goal_share_{window}d'] = _intervals.trailing_sums(goal_met, window) / day_count
+            stats[f'longest_streak_{window}d'] = _trailing_longest_run(goal_starts, goal_ends, days, window)
+            stats[f'eating_start_{window}d'] = (_intervals.trailing_sums(np.nan_to_num(eating_start), window)
+                                                / eating_days)
+            stats[f'eating_end_{window}d'] = (_intervals.trailing_sums(np.nan_to_num(eating_end), window)
+                                              / eating_days)
+    return pd.DataFrame(stats, index=daily.index)
+
+
+@profiling.instrument
+def rollup(fasts: Union[pd.Series, FastingTimeline, pd.DataFrame], discrete: bool = False,
+           granularities=ROLLUP_GRANULARITIES, start_col: str = 'start_dt', end_col: str = 'end_dt',
+           validate: bool = True) -> pd.DataFrame:
+    """
+    Calculate fasting metrics at several granularities in one pass.
+    Daily base aggregates are calculated once from the runs of fasting minutes, then every other granularity is
+    rolled up from the daily aggregates, without touching the minute data again.
+
+    Args:
+        fasts: pandas Series or FastingTimeline of continuous logs,
+               or a DataFrame of discrete logs with start and end datetime columns if discrete is True.
+        discrete: Input is a discrete log, the metrics are calculated without creating the continuous log.
+        granularities: Granularities to roll up to, any of ROLLUP_GRANULARITIES:
+                        - 'day': Each day.
+                        - 'week': Calendar weeks starting Monday.
+                        - 'month': Calendar months.
+                        - 'iso_week': ISO 8601 weeks, e.g. '2021-W02'.
+                        - 'weekday': Each day of the week, across all weeks.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the log first, see validate_continuous_fasts() and validate_discrete_fasts().
+
+    Returns: Tidy pandas DataFrame with a row per granularity per period and columns:
+                - 'granularity': Granularity of the row.
+                - 'period': Label of the period, e.g. '2021-01-17' (day), '2021-01-11' (week starting Monday),
+                  '2021-01' (month), '2021-W02' (ISO week) or 'Monday' (weekday).
+                - 'start': First day of the period, NaT for weekdays.
+                - 'days': Number of days of the log in the period.
+                - 'fasting_hours': Cumulative hours fasted.
+                - 'average_daily_hours': Average daily cumulative hours fasted.
+                - 'max_consecutive_hours': Maximum consecutive hours fasted, see daily_max_consecutive_hours().
+                - 'fasts': Number of runs of fasting starting in the period, back to back fasts count once.
+    """
+    unknown = set(granularities) - set(ROLLUP_GRANULARITIES)
+    if unknown:
+        raise ValueError(f"""
+                        Unknown granularities: {sorted(unknown)}.
+                        Granularities must be any of: {ROLLUP_GRANULARITIES}.
+                        """)
+    if discrete:
+        fasts = continuous_fasts(fasts, start_col, end_col, compact=True, validate=validate)
+    elif validate and not validate_continuous_fasts(fasts):
+        raise Exception('Continuous log is invalid. Check error raised by validate_continuous_log().')
+    if not isinstance(fasts, FastingTimeline):
+        fasts = FastingTimeline.from_series(fasts)
+
+    # Daily base aggregates, in minutes
+    daily = fasts.daily()
+    days = daily.index
+    run_start_instants = fasts.start.value + fasts.run_starts * fasts.step
+    run_start_days = (run_start_instants - days[0].value) // _intervals.NANOSECONDS_PER_DAY
+    daily_fasts = np.bincount(run_start_days, minlength=len(days))
+    cumulative = daily.cumulative.to_numpy()
+    max_consecutive = daily.max_consecutive.to_numpy()
+
+    # Period of each day for every granularity: integer codes, labels and first days
+    iso = days.isocalendar()
+    week_starts = days - pd.to_timedelta(days.dayofweek, unit='D')
+    month_starts = days.to_period('M').to_timestamp()
+    periods = {'day': (days, days.strftime('%Y-%m-%d')),
+               'week': (week_starts, week_starts.strftime('%Y-%m-%d')),
+               'month': (month_starts, month_starts.strftime('%Y-%m')),
+               'iso_week': (week_starts, [f'{year}-W{week:02d}' for year, week in zip(iso.year, iso.week)]),
+               'weekday': (pd.DatetimeIndex([pd.NaT] * len(days)), pd.Index(WEEKDAYS)[days.dayofweek])}
+
+    minutes_per_hour = 60
+    rollups = []
+    for granularity in granularities:
+        starts, labels = periods[granularity]
+        if granularity == 'weekday':
+            codes = days.dayofweek.to_numpy()
+            period_count = len(WEEKDAYS)
+        else:
+            codes, _ = pd.factorize(labels, sort=False)  # Days are in order, so codes are in order of period
+            period_count = codes.max() + 1
+        period_days = np.bincount(codes, minlength=period_count)
+        period_cumulative = np.bincount(codes, weights=cumulative, minlength=period_count)
+        period_fasts = np.bincount(codes, weights=daily_fasts, minlength=period_count).astype('int64')
+        period_max = np.zeros(period_count, dtype='int64')
+        np.maximum.at(period_max, codes, max_consecutive)
+
+        present = period_days > 0
+        first_days = np.zeros(period_count, dtype='int64')
+        first_days[codes[::-1]] = np.arange(len(codes))[::-1]  # First day of each period
+        rollups.append(pd.DataFrame({'granularity': granularity,
+                                     'period': np.asarray(labels)[first_days][present],
+                                     'start': starts[first_days][present],
+                                     'days': period_days[present],
+                                     'fasting_hours': period_cumulative[present] / minutes_per_hour,
+                                     'average_daily_hours': (period_cumulative[present] / period_days[present]
+                                                             / minutes_per_hour),
+                                     'max_consecutive_hours': period_max[present] / minutes_per_hour,
+                                     'fasts': period_fasts[present]}))
+    return pd.concat(rollups, ignore_index=True)
+
+
+def _daily_eating_windows(starts: np.ndarray, ends: np.ndarray, first_day: int, days: int):
+    """Earliest start and latest end of each day's eating windows in hours after midnight, NaN without one."""
+    gap_starts, gap_ends = ends[:-1], starts[1:]
+    eating = gap_starts < gap_ends  # Back to back fasts have no eating window in between
+    gap_starts, gap_ends = gap_starts[eating], gap_ends[eating]
+    day = (gap_starts - first_day) // _intervals.NANOSECONDS_PER_DAY
+    midnight = first_day + day * _intervals.NANOSECONDS_PER_DAY
+
+    nanoseconds_per_hour = 60 * _intervals.NANOSECONDS_PER_MINUTE
+    eating_start = np.full(days, np.inf)
+    eating_end = np.full(days, -np.inf)
+    np.minimum.at(eating_start, day, (gap_starts - midnight) / nanoseconds_per_hour)
+    np.maximum.at(eating_end, day, (gap_ends - midnight) / nanoseconds_per_hour)
+    no_window = np.isinf(eating_start)
+    eating_start[no_window] = np.nan
+    eating_end[no_window] = np.nan
+    return eating_start, eating_end
+
+
+def _trailing_longest_run(run_starts: np.ndarray, run_ends: np.ndarray, periods: int, window: int) -> np.ndarray:
+    """Longest run within each trailing window of positions, clipped to the window, without a loop over windows."""
+    positions = np.arange(periods)
+    first = np.maximum(positions - window + 1, 0)
+    run_lengths = run_ends - run_starts + 1
+
+    # Run at the first position of each window and run at each position, clipped to the window
+    first_run = _intervals.containing_interval(run_starts, run_ends, first)
+    crossing = np.where(first_run >= 0, np.minimum(run_ends[first_run], positions) - first + 1, 0)
+    current_run = _intervals.containing_interval(run_starts, run_ends, positions)
+    current = np.where(current_run >= 0, positions - run_starts[current_run] + 1, 0)
+    current = np.minimum(current, positions - first + 1)
+
+    # Every other run in a window ended within it, after the crossing run: take the maximum length recorded at
+    # run ends over window bounds that skip the crossing run
+    lengths_at_end = np.zeros(periods, dtype='int64')
+    lengths_at_end[run_ends] = run_lengths
+    window_starts = np.where(first_run >= 0, run_ends[first_run] + 1, first)
+    completed = _intervals.range_max(lengths_at_end, window_starts, positions + 1)
+
+    return np.maximum.reduce([crossing, current, completed])
+
+
+def _numpy_daily_steps(fasts: pd.Series, freq: str) -> Tuple[pd.Series, pd.Series]:
+    """Daily cumulative and maximum consecutive fasting time steps of a continuous log with the numpy backend."""
+    with profiling.stage('daily', rows_in=len(fasts)):
+        first_day, cumulative_steps, max_consecutive_steps = backends.daily_steps(fasts.to_numpy(dtype='int64'),
+                                                                                  fasts.index.asi8[0],
+                                                                                  to_offset(freq).nanos)
+    days = pd.date_range(start=pd.Timestamp(first_day), periods=len(cumulative_steps), freq='D')
+    return (pd.Series(cumulative_steps, index=days, name=fasts.name),
+            pd.Series(max_consecutive_steps, index=days, name=fasts.name))
+
+
+def _step_minutes(freq: str) -> Union[int, float]:
+    """Minutes per time step of a continuous log frequency, as an int for whole minutes so counts stay integers."""
+    nanoseconds = to_offset(freq).nanos
+    if nanoseconds % _intervals.NANOSECONDS_PER_MINUTE == 0:
+        return nanoseconds // _intervals.NANOSECONDS_PER_MINUTE
+    return nanoseconds / _intervals.NANOSECONDS_PER_MINUTE
+
+
+# TODO load csv to either discrete or continuous log
@@ -0,0 +1,143 @@
+"""Point and range queries over a discrete log of fasts."""
+import numpy as np
+import pandas as pd
+
+from fasting import _intervals
+from fasting import quantify
+
+
+class FastIndex:
+    """
+    Index of a discrete log for answering point and range queries without creating the continuous log.
+
+    The index keeps the sorted start and end datetimes of the fasts as int64 arrays plus a prefix sum of their
+    durations. Every query is a binary search, O(log n) for n fasts, so query time does not depend on how long
+    the history is. Queries accept a single datetime or an array of datetimes; arrays are answered in one
+    vectorized pass.
+
+    A datetime is fasting if it falls within a fast, start and end datetimes inclusive, the same rule as
+    quantify.continuous_fasts(). Fasting minutes are elapsed time, like quantify.daily_zone_minutes().
+
+    Example:
+        index = FastIndex(quantify.zero_fasts('zero_export.csv'))
+        index.is_fasting('1/17/21 09:00')
+        index.fasting_minutes('1/17/21', '1/24/21')
+        index.overlapping('1/17/21', '1/18/21')
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        validate: Validate the discrete log first, see quantify.validate_discrete_fasts().
+    """
+
+    def __init__(self, fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt',
+                 validate: bool = True):
+        if validate and not quantify.validate_discrete_fasts(fasts, start_col, end_col):
+            raise Exception('Discrete log is invalid. Check error raised by validate_discrete_log().')
+
+        if not fasts[start_col].is_monotonic_increasing:
+            fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+        self.fasts = fasts
+        self.start_col = start_col
+        self.end_col = end_col
+        self.starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+        self.ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+        # Fasts do not overlap, so ends are sorted too and the time fasted before fast i is fasted[i]
+        self.fasted = np.concatenate([[0], np.cumsum(self.ends - self.starts)])
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def fast_at(self, timestamps):
+        """
+        Position of the fast at each datetime, see quantify.fasting_state().
+
+        Args:
+            timestamps: A datetime or array of datetimes.
+
+        Returns: Position of the fast in the sorted discrete log, -1 if not fasting.
+        """
+        points, scalar = _nanoseconds(timestamps)
+        fast = _intervals.containing_interval(self.starts, self.ends, points)
+        return fast[0] if scalar else fast
+
+    def is_fasting(self, timestamps):
+        """
+        Fasting status at each datetime.
+
+        Args:
+            timestamps: A datetime or array of datetimes.
+
+        Returns: True if fasting, as a bool or bool array.
+        """
+        return self.fast_at(timestamps) >= 0
+
+    def fasting_minutes(self, begin, end):
+        """
+        Total minutes fasted between begin and end datetimes.
+
+        Args:
+            begin: A datetime or array of datetimes, the start of each range.
+            end: A datetime or array of datetimes, the end of each range.
+
+        Returns: Minutes fasted in each range, 0 for ranges that end before they begin.
+        """
+        begins, scalar = _nanoseconds(begin)
+        ends, _ = _nanoseconds(end)
+        minutes = np.maximum(self._fasted_before(ends) - self._fasted_before(begins), 0)
+        minutes = minutes / _intervals.NANOSECONDS_PER_MINUTE
+        return minutes[0] if scalar else minutes
+
+    def count_overlapping(self, begin, end):
+        """
+        Number of fasts overlapping the range between begin and end datetimes, inclusive.
+
+        Args:
+            begin: A datetime or array of datetimes, the start of each range.
+            end: A datetime or array of datetimes, the end of each range.
+
+        Returns: Number of fasts overlapping each range.
+        """
+        begins, scalar = _nanoseconds(begin)
+        ends, _ = _nanoseconds(end)
+        first, stop = self._overlapping_positions(begins, ends)
+        counts = np.maximum(stop - first, 0)
+        return counts[0] if scalar else counts
+
+    def overlapping(self, begin, end) -> pd.DataFrame:
+        """
+        Fasts overlapping the range between begin and end datetimes, inclusive.
+
+        Args:
+            begin: Start datetime of the range.
+            end: End datetime of the range.
+
+        Returns: pandas DataFrame of the overlapping fasts from the discrete log, oldest to newest.
+        """
+        begins, _ = _nanoseconds(begin)
+        ends, _ = _nanoseconds(end)
+        first, stop = self._overlapping_positions(begins, ends)
+        return self.fasts.iloc[first[0]:max(stop[0], first[0])]
+
+    def _fasted_before(self, points: np.ndarray) -> np.ndarray:
+        """Nanoseconds fasted before each point: whole fasts that started before it plus the part of the last."""
+        fast = np.searchsorted(self.starts, points, side='right') - 1  # Last fast starting on or before the point
+        started = fast >= 0
+        fast = np.maximum(fast, 0)
+        partial = np.where(started, np.minimum(points, self.ends[fast]) - self.starts[fast], 0) if len(self) else 0
+        return np.where(started, self.fasted[fast], 0) + partial
+
+    def _overlapping_positions(self, begins: np.ndarray, ends: np.ndarray):
+        """First position and stop position (exclusive) of the fasts overlapping each range."""
+        first = np.searchsorted(self.ends, begins, side='left')  # First fast ending on or after the begin
+        stop = np.searchsorted(self.starts, ends, side='right')  # Fasts starting on or before the end
+        return first, stop
+
+
+def _nanoseconds(timestamps):
+    """Convert a datetime or array of datetimes to an int64 nanoseconds array, and whether the input was scalar."""
+    scalar = np.ndim(timestamps) == 0
+    if scalar:
+        return np.array([pd.Timestamp(timestamps).value]), True
+    return pd.DatetimeIndex(timestamps).asi8, False
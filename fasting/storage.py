@@ -0,0 +1,216 @@
+"""Save and load discrete and continuous logs without parsing datetimes."""
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from fasting.timeline import FastingTimeline
+
+FORMATS = ['npy', 'parquet']
+METADATA_FILE = 'metadata.json'
+
+
+def save_discrete(fasts: pd.DataFrame, path: str, start_col: str = 'start_dt', end_col: str = 'end_dt',
+                  file_format: str = 'npy'):
+    """
+    Save a discrete log as fixed-width int64 arrays of nanoseconds since epoch.
+    Timezone-aware datetimes are saved as UTC with the name of their timezone, and loaded in that timezone.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns.
+        path: Directory to save the log to ('npy' format) or file path ('parquet' format).
+              An existing log at path is replaced.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        file_format: 'npy' for a directory of NumPy files, or 'parquet' for a Parquet file (requires pyarrow).
+    """
+    _validate_format(file_format)
+    if file_format == 'parquet':
+        _require_pyarrow()
+        fasts[[start_col, end_col]].to_parquet(path, engine='pyarrow', index=False)
+        return
+
+    tz = _timezone(fasts[start_col])
+    if _timezone(fasts[end_col]) != tz:
+        raise ValueError(f"""
+                        Start and end datetimes must be in the same timezone.
+                        Timezone of '{start_col}': {tz}, timezone of '{end_col}': {_timezone(fasts[end_col])}.
+                        """)
+    # For timezone-aware columns the values are UTC datetimes
+    starts = fasts[start_col].values.astype('datetime64[ns]')
+    ends = fasts[end_col].values.astype('datetime64[ns]')
+    _save_arrays(path, {'kind': 'discrete', 'columns': [start_col, end_col], 'tz': tz},
+                 start=starts.view('int64'), end=ends.view('int64'))
+
+
+def load_discrete(path: str, mmap: bool = True, file_format: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a discrete log saved by save_discrete().
+    The datetimes are not parsed, but the DataFrame holds copies of the arrays: with mmap the files are read
+    through the page cache instead of into a buffer first, the columns are not views of the files.
+
+    Args:
+        path: Directory ('npy' format) or file path ('parquet' format) the log was saved to.
+        mmap: Memory-map the NumPy files instead of reading them into memory.
+        file_format: 'npy' or 'parquet', by default 'npy' for a directory and 'parquet' for a file.
+
+    Returns: DataFrame of discrete logs with start and end datetime columns.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No discrete log at {path}.")
+    if file_format is None:
+        file_format = 'npy' if os.path.isdir(path) else 'parquet'
+    _validate_format(file_format)
+
+    if file_format == 'parquet':
+        _require_pyarrow()
+        return pd.read_parquet(path, engine='pyarrow')
+
+    if not os.path.isdir(path):
+        raise ValueError(f"A discrete log in 'npy' format is a directory, {path} is a file.")
+    metadata, arrays = _load_arrays(path, 'discrete', mmap)
+    start_col, end_col = metadata['columns']
+    fasts = pd.DataFrame({start_col: arrays['start'].view('datetime64[ns]'),
+                          end_col: arrays['end'].view('datetime64[ns]')})
+    tz = metadata.get('tz')
+    if tz is not None:
+        for column in [start_col, end_col]:
+            fasts[column] = fasts[column].dt.tz_localize('UTC').dt.tz_convert(tz)
+    return fasts
+
+
+def save_continuous(fasts: Union[pd.Series, FastingTimeline], path: str):
+    """
+    Save a continuous log as NumPy files that can be memory-mapped.
+    A pandas Series is saved as an int64 array of fasting status, one value per time step, so it loads without copying.
+    A FastingTimeline is saved as its runs of fasting time steps.
+
+    Args:
+        fasts: pandas Series of fasting status with a regular datetime index, or a FastingTimeline.
+        path: Directory to save the log to.
+    """
+    if isinstance(fasts, FastingTimeline):
+        metadata = {'kind': 'continuous', 'compact': True, 'start': fasts.start.isoformat(),
+                    'periods': fasts.periods, 'freq': fasts.freq.freqstr}
+        _save_arrays(path, metadata, run_starts=fasts.run_starts, run_ends=fasts.run_ends)
+        return
+
+    freq = fasts.index.freq or pd.infer_freq(fasts.index)
+    if freq is None:
+        raise ValueError("Continuous log must have a regular datetime index.")
+    # Timezone aware indexes are saved as their UTC start and timezone name, the same as save_discrete()
+    tz = _timezone(fasts.index)
+    start = fasts.index[0] if tz is None else fasts.index[0].tz_convert('UTC').tz_localize(None)
+    metadata = {'kind': 'continuous', 'compact': False, 'start': start.isoformat(), 'tz': tz,
+                'periods': len(fasts), 'freq': pd.tseries.frequencies.to_offset(freq).freqstr}
+    _save_arrays(path, metadata, status=fasts.to_numpy(dtype='int64'))
+
+
+def load_continuous(path: str, mmap: bool = True) -> Union[pd.Series, FastingTimeline]:
+    """
+    Load a continuous log saved by save_continuous().
+    With mmap, the values of a pandas Series are a read-only memory-mapped view of the file: loading is nearly free
+    and processes loading the same file share its memory through the operating system's page cache.
+
+    Args:
+        path: Directory the log was saved to.
+        mmap: Memory-map the NumPy files instead of reading them into memory.
+
+    Returns: pandas Series of fasting status, or a FastingTimeline if a FastingTimeline was saved.
+    """
+    metadata, arrays = _load_arrays(path, 'continuous', mmap)
+    if metadata['compact']:
+        return FastingTimeline(metadata['start'], metadata['periods'], arrays['run_starts'], arrays['run_ends'],
+                               freq=metadata['freq'])
+
+    start = pd.Timestamp(metadata['start'])
+    tz = metadata.get('tz')
+    if tz is not None:
+        start = start.tz_localize('UTC').tz_convert(tz)
+    index = pd.date_range(start=start, periods=metadata['periods'], freq=metadata['freq'])
+    return pd.Series(arrays['status'], index=index)
+
+
+def _validate_format(file_format: str):
+    if file_format not in FORMATS:
+        raise ValueError(f"""
+                        Unknown format: {file_format}.
+                        Format must be one of: {FORMATS}.
+                        """)
+
+
+def _timezone(datetimes: Union[pd.Series, pd.DatetimeIndex]) -> Optional[str]:
+    """Name of the timezone of timezone-aware datetimes, None for naive datetimes."""
+    tz = getattr(datetimes.dtype, 'tz', None)
+    if tz is None:
+        return None
+    name = str(tz)
+    try:
+        pd.DatetimeTZDtype(tz=name)
+    except Exception:
+        message = f"Timezone {tz!r} can not be saved by name, convert the datetimes to a named timezone."
+        raise ValueError(message) from None
+    return name
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet format requires pyarrow: pip install pyarrow") from None
+
+
+def _save_arrays(path: str, metadata: dict, **arrays: np.ndarray):
+    """
+    Save arrays as .npy files in a directory, with a JSON file of metadata.
+    The files are written to a temporary directory next to path and swapped in, so a failed save leaves any
+    previous log intact and no files of a previous log are left behind.
+    """
+    path = os.path.abspath(path)
+    if os.path.exists(path) and not (os.path.isdir(path) and
+                                     (not os.listdir(path) or os.path.exists(os.path.join(path, METADATA_FILE)))):
+        raise FileExistsError(f"{path} exists and is not a saved log, it will not be replaced.")
+
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    temporary = tempfile.mkdtemp(dir=parent, prefix=f'.{os.path.basename(path)}.')
+    previous = None
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(temporary, METADATA_FILE), 'w') as file:
+            json.dump(metadata, file)
+
+        # A directory can only replace a missing or empty directory, so move the previous log aside first
+        if os.path.exists(path):
+            previous = tempfile.mkdtemp(dir=parent, prefix=f'.{os.path.basename(path)}.previous.')
+            os.replace(path, os.path.join(previous, 'log'))
+        os.replace(temporary, path)
+    except BaseException:
+        if previous is not None and not os.path.exists(path):
+            os.replace(os.path.join(previous, 'log'), path)
+        shutil.rmtree(temporary, ignore_errors=True)
+        raise
+    finally:
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+
+def _load_arrays(path: str, kind: str, mmap: bool):
+    """Load the metadata and .npy files of a directory saved by _save_arrays()."""
+    with open(os.path.join(path, METADATA_FILE)) as file:
+        metadata = json.load(file)
+    if metadata['kind'] != kind:
+        raise ValueError(f"""
+                        Expected a {kind} log at {path}.
+                        Found a {metadata['kind']} log.
+                        """)
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {filename[:-len('.npy')]: np.load(os.path.join(path, filename), mmap_mode=mmap_mode)
+              for filename in os.listdir(path) if filename.endswith('.npy')}
+    return metadata, arrays
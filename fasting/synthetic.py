@@ -0,0 +1,121 @@
+"""Synthetic fasting logs and Zero Fasting log exports, for benchmarks and tests."""
+import os
+from typing import Callable, Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from fasting import _intervals
+from fasting import quantify
+
+# Hours distribution as (mean, standard deviation) of a normal distribution,
+# or a function of (random number generator, size) returning an array of hours
+HoursDistribution = Union[Tuple[float, float], Callable[[np.random.Generator, int], np.ndarray]]
+
+# Typical fasting schedules: (mean, standard deviation) of fast hours
+FAST_SCHEDULES = {'12:12': (12, 1),
+                  '16:8': (16, 1.5),
+                  '18:6': (18, 1.5),
+                  'one meal a day': (23, 1)}
+
+
+def discrete_log(years: float = 1, start='1/1/21', fast_hours: HoursDistribution = FAST_SCHEDULES['16:8'],
+                 eating_hours: HoursDistribution = None, seed=None) -> pd.DataFrame:
+    """
+    Generate a discrete log of fasts separated by eating windows, at minute resolution like a Zero Fasting export.
+
+    Args:
+        years: Years covered by the log, starting at start.
+        start: Start datetime of the first fast.
+        fast_hours: Distribution of fast durations in hours, see FAST_SCHEDULES. Durations are at least 1 hour.
+        eating_hours: Distribution of eating window durations in hours between fasts, at least 15 minutes.
+                      Defaults to the rest of the day after a mean fast, with a standard deviation of 2 hours.
+        seed: Seed of the random number generator, for reproducible logs.
+
+    Returns: pandas DataFrame of start and end datetimes of each fast, oldest to newest,
+             same as quantify.zero_fasts().
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start).floor('T').value
+    stop = start + int(years * 365.25 * 24 * 60) * _intervals.NANOSECONDS_PER_MINUTE
+    if eating_hours is None:
+        mean_fast_hours = fast_hours[0] if isinstance(fast_hours, tuple) else _sample(rng, fast_hours, 1000).mean()
+        eating_hours = (max(24 - mean_fast_hours, 1), 2)
+
+    # Sample fasts and eating windows a year at a time until the log covers the requested years
+    durations = []
+    end = start
+    while end < stop:
+        fast_minutes = np.maximum(np.round(_sample(rng, fast_hours, 400) * 60), 60).astype('int64')
+        eating_minutes = np.maximum(np.round(_sample(rng, eating_hours, 400) * 60), 15).astype('int64')
+        durations.append(np.column_stack([fast_minutes, eating_minutes]).ravel())
+        end += int(durations[-1].sum()) * _intervals.NANOSECONDS_PER_MINUTE
+    durations = np.concatenate(durations) * _intervals.NANOSECONDS_PER_MINUTE
+
+    boundaries = start + np.concatenate([[0], np.cumsum(durations)])
+    starts, ends = boundaries[:-1:2], boundaries[1::2]
+    keep = ends <= stop
+    return pd.DataFrame({'start_dt': starts[keep].view('datetime64[ns]'),
+                         'end_dt': ends[keep].view('datetime64[ns]')})
+
+
+def zero_export(fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt', seed=None) -> pd.DataFrame:
+    """
+    Convert a discrete log to the rows of a Zero Fasting log export, newest fasts first.
+    'Hours' is written with enough precision for quantify.zero_fasts() to load the same discrete log.
+
+    Args:
+        fasts: DataFrame of discrete logs with start and end datetime columns, at minute resolution.
+        start_col: Name of column representing fasting start datetimes.
+        end_col: Name of column representing fasting end datetimes.
+        seed: Seed of the random number generator for the 'Night Eating' column.
+
+    Returns: pandas DataFrame with the columns of a Zero Fasting log export, all values as strings.
+    """
+    rng = np.random.default_rng(seed)
+    fasts = fasts.iloc[::-1]
+    starts = pd.DatetimeIndex(fasts[start_col])
+    ends = pd.DatetimeIndex(fasts[end_col])
+
+    # Half a minute past the true duration: zero_fasts() takes the day of start + hours, so the day is never early
+    hours = ((ends - starts) / pd.Timedelta(minutes=1) + 0.5) / 60
+    export = pd.DataFrame({'Date': starts.strftime(quantify.ZERO_DATE_FORMAT),
+                           'Start': starts.strftime(quantify.ZERO_TIME_FORMAT),
+                           'End': ends.strftime(quantify.ZERO_TIME_FORMAT),
+                           'Hours': np.char.mod('%.4f', hours.to_numpy()),
+                           'Night Eating': rng.integers(0, 3, size=len(fasts)).astype(str)})
+    return export[quantify.ZERO_COLUMNS]
+
+
+def cohort_exports(directory: str, users: int = 10, years: float = 1, seed=None,
+                   **log_options) -> Dict[str, str]:
+    """
+    Write a Zero Fasting log export for each user of a synthetic cohort, see discrete_log().
+
+    Args:
+        directory: Directory to write the exports to, created if missing.
+        users: Number of users.
+        years: Years covered by each user's log.
+        seed: Seed of the random number generator, for reproducible exports.
+        **log_options: Options passed to discrete_log(), e.g. fast_hours.
+
+    Returns: Mapping of user id to file path of the user's log export, as used by cohort.cohort_daily_metrics().
+    """
+    os.makedirs(directory, exist_ok=True)
+    user_seeds = np.random.SeedSequence(seed).spawn(users)
+    exports = {}
+    for user, user_seed in enumerate(user_seeds):
+        user_id = f'user_{user:05d}'
+        fasts = discrete_log(years=years, seed=user_seed, **log_options)
+        path = os.path.join(directory, f'{user_id}.csv')
+        zero_export(fasts, seed=user_seed).to_csv(path, index=False)
+        exports[user_id] = path
+    return exports
+
+
+def _sample(rng: np.random.Generator, distribution: HoursDistribution, size: int) -> np.ndarray:
+    """Sample hours from a (mean, standard deviation) normal distribution or a sampling function."""
+    if callable(distribution):
+        return np.asarray(distribution(rng, size), dtype='float64')
+    mean, standard_deviation = distribution
+    return rng.normal(mean, standard_deviation, size=size)
@@ -0,0 +1,226 @@
+"""Compact continuous log of fasting status."""
+import numpy as np
+import pandas as pd
+
+from fasting import _intervals
+
+
+class FastingTimeline:
+    """
+    A continuous log of fasting status stored as runs of fasting time steps (run-length encoded)
+    instead of one int64 value per time step.
+
+    The timeline covers `periods` time steps of length `freq`, starting at `start`.
+    Each run is the first and last time step position (inclusive) of a period of uninterrupted fasting,
+    every other time step is not fasting. Memory scales with the number of fasts rather than the number of minutes.
+
+    A timeline can be passed to the quantify module functions anywhere a continuous log (pandas Series) is accepted.
+
+    Args:
+        start: Timestamp of the first time step.
+        periods: Number of time steps.
+        run_starts: First time step position of each run, sorted ascending.
+        run_ends: Last time step position of each run, runs can not overlap or touch.
+        freq: Length of a time step, default 1 minute.
+    """
+
+    def __init__(self, start, periods: int, run_starts, run_ends, freq='1T'):
+        self.start = pd.Timestamp(start)
+        self.periods = int(periods)
+        self.freq = pd.tseries.frequencies.to_offset(freq)
+        self.run_starts = np.asarray(run_starts, dtype='int64')
+        self.run_ends = np.asarray(run_ends, dtype='int64')
+
+        if len(self.run_starts) != len(self.run_ends):
+            raise ValueError("run_starts and run_ends must be the same length.")
+        if len(self.run_starts) and (self.run_starts[0] < 0 or self.run_ends[-1] >= self.periods
+                                     or (self.run_starts > self.run_ends).any()
+                                     or (self.run_starts[1:] <= self.run_ends[:-1] + 1).any()):
+            raise ValueError("""
+                            Runs must be sorted, within the timeline, and can not overlap or touch.
+                            """)
+
+    @property
+    def step(self) -> int:
+        """Length of a time step in nanoseconds."""
+        return self.freq.nanos
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """Timestamp of the last time step."""
+        return self.start + (self.periods - 1) * self.freq
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        """Datetime index of the equivalent continuous log."""
+        return pd.date_range(start=self.start, periods=self.periods, freq=self.freq)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the runs, in bytes."""
+        return self.run_starts.nbytes + self.run_ends.nbytes
+
+    @classmethod
+    def from_series(cls, fasts: pd.Series) -> 'FastingTimeline':
+        """
+        Create a timeline from a continuous log.
+
+        Args:
+            fasts: pandas Series of fasting status with a regular datetime index.
+                        - Yes (ie. fasting) as 1.
+                        - No (i.e. not fasting) as 0.
+
+        Returns: FastingTimeline of the continuous log.
+        """
+        freq = fasts.index.freq or pd.infer_freq(fasts.index)
+        if freq is None:
+            raise ValueError("Continuous log must have a regular datetime index.")
+        if not fasts.isin([0, 1]).all():
+            raise ValueError("Continuous log must contain only values of 0 or 1.")
+        run_starts, run_ends = _intervals.runs_from_status(fasts.values)
+        return cls(fasts.index[0], len(fasts), run_starts, run_ends, freq=freq)
+
+    @classmethod
+    def from_discrete(cls, fasts: pd.DataFrame, start_col: str = 'start_dt', end_col: str = 'end_dt',
+                      freq='1T') -> 'FastingTimeline':
+        """
+        Create a timeline from a discrete log, covering the first start to the last end datetime.
+        Same time steps as quantify.continuous_fasts(), without creating the continuous log.
+        The discrete log must be valid, with timezone naive datetimes, see quantify.validate_discrete_fasts().
+
+        Args:
+            fasts: DataFrame of discrete logs with start and end datetime columns.
+            start_col: Name of column representing fasting start datetimes.
+            end_col: Name of column representing fasting end datetimes.
+            freq: Length of a time step, default 1 minute.
+
+        Returns: FastingTimeline of the discrete log.
+        """
+        if not fasts[start_col].is_monotonic_increasing:
+            fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+        starts = fasts[start_col].values.astype('datetime64[ns]').view('int64')
+        ends = fasts[end_col].values.astype('datetime64[ns]').view('int64')
+
+        step = pd.tseries.frequencies.to_offset(freq).nanos
+        origin = starts[0]
+        periods = (ends.max() - origin) // step + 1
+        run_starts, run_ends = _intervals.grid_runs(starts, ends, origin, step)
+        return cls(pd.Timestamp(origin), periods, run_starts, run_ends, freq=freq)
+
+    @classmethod
+    def from_packed(cls, bits: np.ndarray, start, periods: int, freq='1T') -> 'FastingTimeline':
+        """
+        Create a timeline from a bit-packed fasting status, as returned by to_packed().
+
+        Args:
+            bits: uint8 array of fasting status packed 8 time steps per byte.
+            start: Timestamp of the first time step.
+            periods: Number of time steps.
+            freq: Length of a time step, default 1 minute.
+
+        Returns: FastingTimeline of the fasting status.
+        """
+        status = np.unpackbits(np.asarray(bits, dtype='uint8'), count=periods)
+        run_starts, run_ends = _intervals.runs_from_status(status)
+        return cls(start, periods, run_starts, run_ends, freq=freq)
+
+    def to_packed(self) -> np.ndarray:
+        """
+        Bit-pack the fasting status, 8 time steps per byte.
+        Use when fasts are too fragmented for runs to be compact; memory is fixed at periods / 8 bytes.
+
+        Returns: uint8 array of packed fasting status.
+        """
+        return np.packbits(self.status().astype('uint8'))
+
+    def status(self) -> np.ndarray:
+        """Fasting status (0 or 1) at each time step as an int64 array."""
+        return _intervals.status_from_runs(self.run_starts, self.run_ends, self.periods)
+
+    def to_series(self) -> pd.Series:
+        """
+        Convert to a continuous log.
+
+        Returns: pandas Series of fasting status, identical to quantify.continuous_fasts().
+        """
+        return pd.Series(self.status(), index=self.index)
+
+    def consecutive(self) -> pd.Series:
+        """
+        Consecutive time steps fasted, see quantify.consecutive_minutes().
+
+        Returns: pandas Series of consecutive time steps fasted.
+        """
+        counter = _intervals.run_counter(self.run_starts, self.run_ends, self.periods)
+        return pd.Series(counter, index=self.index)
+
+    def daily(self) -> pd.DataFrame:
+        """
+        Daily fasting time steps, with midnight splits calculated once for both columns:
+            - 'cumulative': Number of fasting time steps each day, same as a daily resample sum of the continuous log.
+            - 'max_consecutive': Longest run of fasting time steps each day, including time steps carried over
+              from previous days. Same as a daily resample max of the consecutive time steps.
+
+        Returns: pandas DataFrame of daily fasting time steps.
+        """
+        first_day, cumulative_steps, max_consecutive_steps = _intervals.daily_runs(
+            self.run_starts, self.run_ends, self.start.value, self.periods, self.step)
+        days = pd.date_range(start=pd.Timestamp(first_day), periods=len(cumulative_steps), freq='1D')
+        return pd.DataFrame({'cumulative': cumulative_steps, 'max_consecutive': max_consecutive_steps}, index=days)
+
+    def daily_sum(self) -> pd.Series:
+        """
+        Number of fasting time steps each day, same as a daily resample sum of the continuous log.
+
+        Returns: pandas Series of daily fasting time steps.
+        """
+        return self.daily()['cumulative'].rename(None)
+
+    def daily_max_consecutive(self) -> pd.Series:
+        """
+        Longest run of fasting time steps each day, including time steps carried over from previous days.
+        Same as a daily resample max of the consecutive time steps.
+
+        Returns: pandas Series of the daily maximum consecutive fasting time steps.
+        """
+        return self.daily()['max_consecutive'].rename(None)
+
+    def __len__(self) -> int:
+        return self.periods
+
+    def __getitem__(self, key) -> 'FastingTimeline':
+        """
+        Slice the timeline. Integer bounds are positional (stop exclusive),
+        datetime bounds are labels (stop inclusive) like slicing a pandas Series.
+        """
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("FastingTimeline only supports slicing without a step, e.g. timeline['1/1/21':'1/2/21'].")
+
+        if isinstance(key.start, (int, np.integer)) or isinstance(key.stop, (int, np.integer)):
+            first, last, _ = key.indices(self.periods)
+            last -= 1
+        else:
+            first = 0
+            last = self.periods - 1
+            if key.start is not None:
+                first = max(first, -((self.start.value - pd.Timestamp(key.start).value) // self.step))
+            if key.stop is not None:
+                last = min(last, (pd.Timestamp(key.stop).value - self.start.value) // self.step)
+        last = max(last, first - 1)
+
+        # Clip runs to the slice and shift positions to the new start
+        keep = (self.run_ends >= first) & (self.run_starts <= last)
+        run_starts = np.maximum(self.run_starts[keep], first) - first
+        run_ends = np.minimum(self.run_ends[keep], last) - first
+        return FastingTimeline(self.start + first * self.freq, last - first + 1, run_starts, run_ends, freq=self.freq)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FastingTimeline):
+            return NotImplemented
+        return (self.start == other.start and self.periods == other.periods and self.freq == other.freq
+                and np.array_equal(self.run_starts, other.run_starts)
+                and np.array_equal(self.run_ends, other.run_ends))
+
+    def __repr__(self) -> str:
+        return (f"FastingTimeline(start={self.start}, end={self.end}, freq={self.freq.freqstr}, "
+                f"runs={len(self.run_starts)})")
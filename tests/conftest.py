@@ -0,0 +1,49 @@
+"""Test data shared by the test modules: discrete logs and Zero Fasting log exports."""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+# Discrete log of two fasts, the second fast starts on the day the first fast ends
+FAST_STARTS = ['1/16/21 20:05:00', '1/17/21 12:15:00']
+FAST_ENDS = ['1/17/21 10:05:00', '1/18/21 12:15:00']
+
+# Rows of Zero Fasting log exports, newest fasts first
+ZERO_COLUMNS = ['Date', 'Start', 'End', 'Hours', 'Night Eating']
+ZERO_FAST_DATA_EXPORT = [['1/17/21', '12:15', '12:15', '24', '1'],
+                         ['1/16/21', '20:05', '10:05', '14', '2']]  # Same fasts as FAST_STARTS and FAST_ENDS
+ZERO_FAST_DATA_EXPORT_LONG = [['2/18/21', '13:23', '10:00', '44', '0'],
+                              ['2/14/21', '20:30', '9:39', '13', '2'],
+                              ['2/11/21', '19:30', '8:51', '13', '1']]
+ZERO_FAST_DATA_EXPORT_OVERLAPPING = [['1/17/21', '9:00', '12:00', '3', '1'],
+                                     ['1/16/21', '20:05', '10:05', '14', '2']]
+
+
+def discrete_log(starts=FAST_STARTS, ends=FAST_ENDS) -> pd.DataFrame:
+    """Discrete log of fasts from lists of start and end datetime strings."""
+    return pd.DataFrame(data={'start_dt': starts, 'end_dt': ends}, dtype='datetime64[ns]')
+
+
+def random_discrete_log(seed=0, size: int = 200) -> pd.DataFrame:
+    """Discrete log of fasts of random durations and gaps, including back to back fasts (gap of 0)."""
+    rng = np.random.default_rng(seed)
+    gaps = rng.integers(0, 20 * 60, size=size)  # minutes
+    durations = rng.integers(1, 40 * 60, size=size)  # minutes
+    starts = pd.Timestamp('1/1/21 07:13:00') + pd.to_timedelta(np.cumsum(gaps + durations) - durations, unit='m')
+    return pd.DataFrame({'start_dt': starts, 'end_dt': starts + pd.to_timedelta(durations, unit='m')})
+
+
+def write_export(filename: str, rows, columns=ZERO_COLUMNS) -> str:
+    """Write rows of a Zero Fasting log export to a CSV file, returning the file name."""
+    pd.DataFrame(rows, columns=columns).to_csv(filename, index=False)
+    return filename
+
+
+@pytest.fixture(scope='session')
+def discrete():
+    return discrete_log()
+
+
+@pytest.fixture(scope='session')
+def discrete_random():
+    return random_discrete_log()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.backends` module."""
+
+import subprocess
+import sys
+
+import pytest
+from fasting import backends
+from fasting import quantify
+from fasting import synthetic
+import pandas as pd
+
+
+@pytest.fixture(scope='session')
+def discrete_logs(discrete, discrete_random):
+    # Timestamps that are not on the minute grid of the first fast
+    off_grid = discrete.copy()
+    off_grid.at[1, 'start_dt'] += pd.Timedelta(seconds=30)
+    off_grid.at[1, 'end_dt'] += pd.Timedelta(seconds=30)
+
+    # Back to back fasts, fasts shorter than a time step and an unsorted log
+    return [discrete, off_grid, discrete_random, discrete_random.iloc[::-1], synthetic.discrete_log(years=1, seed=0)]
+
+
+@pytest.mark.parametrize('freq', ['1T', '15T', '30S'])
+def test_backends_equal(discrete_logs, freq):
+    for fasts in discrete_logs:
+        expected = quantify.continuous_fasts(fasts, freq=freq, backend='pandas')
+        output = quantify.continuous_fasts(fasts, freq=freq, backend='numpy')
+        assert output.equals(expected)
+        assert output.index.freq == expected.index.freq
+
+        for function in [quantify.daily_cumulative_hours, quantify.daily_max_consecutive_hours]:
+            expected_daily = function(expected, freq=freq, backend='pandas')
+            output_daily = function(expected, freq=freq, backend='numpy')
+            assert output_daily.equals(expected_daily)
+            assert output_daily.index.equals(expected_daily.index)
+
+
+def test_validate_discrete_fasts_backends(discrete_logs):
+    discrete = discrete_logs[0]
+    missing_end = discrete.copy()
+    missing_end['end_dt'] = None
+    overlapping = discrete.copy()
+    overlapping.at[0, 'end_dt'] = discrete.at[1, 'start_dt']
+    overlapping.at[1, 'start_dt'] = discrete.at[0, 'end_dt']
+    aware = discrete.apply(lambda column: column.dt.tz_localize('America/New_York'))
+
+    for fasts in discrete_logs:
+        assert quantify.validate_discrete_fasts(fasts, backend='numpy')
+
+    # Both backends raise the same error, listing the offending fasts
+    invalid_logs = [(missing_end, 'start_dt', 'end_dt'), (discrete, 'end_dt', 'start_dt'),
+                    (overlapping, 'start_dt', 'end_dt'), (overlapping.iloc[::-1], 'start_dt', 'end_dt'),
+                    (aware, 'start_dt', 'end_dt')]
+    for fasts, start_col, end_col in invalid_logs:
+        errors = []
+        for backend in backends.BACKENDS:
+            with pytest.raises(ValueError) as error:
+                quantify.validate_discrete_fasts(fasts, start_col, end_col, backend=backend)
+            errors.append(str(error.value))
+        assert errors[0] == errors[1]
+
+    # Timezone aware logs are rejected by both backends, the same as by the discrete=True daily functions
+    for backend in backends.BACKENDS:
+        with pytest.raises(ValueError, match='timezone naive'):
+            quantify.continuous_fasts(aware, backend=backend)
+
+    problem, positions = backends.discrete_problems(
+        overlapping.start_dt.values.view('int64')[::-1], overlapping.end_dt.values.view('int64')[::-1])
+    assert problem == 'overlap'
+    assert list(positions) == [0]
+
+
+def test_select_backend(discrete_logs, mocker, monkeypatch):
+    # Start from the default backend, whatever FASTING_BACKEND is set to in the environment running the tests
+    monkeypatch.delenv(backends.BACKEND_ENV, raising=False)
+    monkeypatch.setattr(backends, '_backend', 'pandas')
+    assert backends.get_backend() == 'pandas'
+    kernel = mocker.spy(backends, 'continuous_status')
+
+    with backends.use_backend('numpy'):
+        assert backends.get_backend() == 'numpy'
+        quantify.continuous_fasts(discrete_logs[0])
+        assert kernel.call_count == 1
+        quantify.continuous_fasts(discrete_logs[0], backend='pandas')  # Per call backend overrides the global one
+        assert kernel.call_count == 1
+    assert backends.get_backend() == 'pandas'
+
+    backends.set_backend('numpy')
+    try:
+        quantify.continuous_fasts(discrete_logs[0])
+        assert kernel.call_count == 2
+    finally:
+        backends.set_backend('pandas')
+
+    with pytest.raises(ValueError):
+        backends.set_backend('polars')
+    with pytest.raises(ValueError):
+        quantify.continuous_fasts(discrete_logs[0], backend='polars')
+    assert backends.get_backend() == 'pandas'
+
+
+def test_backend_environment_variable(monkeypatch):
+    monkeypatch.setenv(backends.BACKEND_ENV, 'numpy')
+    script = 'from fasting import backends; assert backends.get_backend() == "numpy"'
+    subprocess.run([sys.executable, '-c', script], check=True)
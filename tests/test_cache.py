@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.cache` module."""
+
+import os
+
+import pytest
+from fasting import quantify
+from fasting.cache import ExportCache
+import pandas as pd
+from tests.conftest import ZERO_FAST_DATA_EXPORT, write_export
+
+
+@pytest.fixture
+def zero_log(tmpdir):
+    return write_export(str(tmpdir.join('data.csv')), ZERO_FAST_DATA_EXPORT)
+
+
+def test_cached_results_match(zero_log, tmpdir):
+    cache = ExportCache(directory=str(tmpdir.join('cache')))
+    discrete_log = quantify.zero_fasts(zero_log)
+    continuous_log = quantify.continuous_fasts(discrete_log)
+
+    for _ in range(2):  # Miss, then hit
+        assert cache.zero_fasts(zero_log).equals(discrete_log)
+        assert cache.continuous_fasts(zero_log).equals(continuous_log)
+        assert cache.continuous_fasts(zero_log, compact=True) == quantify.continuous_fasts(discrete_log, compact=True)
+        daily = cache.daily_metrics(zero_log)
+        assert daily.cumulative_hours.equals(quantify.daily_cumulative_hours(continuous_log).rename('cumulative_hours'))
+        assert daily.max_consecutive_hours.equals(
+            quantify.daily_max_consecutive_hours(continuous_log).rename('max_consecutive_hours'))
+
+
+def test_repeat_requests_skip_parsing(zero_log, tmpdir, mocker):
+    directory = str(tmpdir.join('cache'))
+    parse = mocker.spy(quantify, 'zero_fasts')
+    build = mocker.spy(quantify, 'continuous_fasts')
+
+    cache = ExportCache(directory=directory)
+    cache.daily_metrics(zero_log)
+    cache.daily_metrics(zero_log)
+    cache.zero_fasts(zero_log)
+    assert parse.call_count == 1
+    assert build.call_count == 1
+    assert cache.stats['memory_hits'] == 2
+
+    # A new process (empty memory) reads entries from disk
+    cache = ExportCache(directory=directory)
+    cache.daily_metrics(zero_log)
+    assert parse.call_count == 1
+    assert cache.stats['disk_hits'] == 1
+
+
+def test_changed_file_invalidates(zero_log, tmpdir):
+    cache = ExportCache(directory=str(tmpdir.join('cache')))
+    assert len(cache.zero_fasts(zero_log)) == 2
+
+    write_export(zero_log, ZERO_FAST_DATA_EXPORT[1:])
+    assert len(cache.zero_fasts(zero_log)) == 1
+    assert cache.stats['misses'] == 2
+
+
+def test_same_size_rewrite_invalidates(zero_log):
+    cache = ExportCache()
+    assert cache.zero_fasts(zero_log).end_dt.iloc[0] == pd.Timestamp('1/17/21 10:05')
+
+    # Same size and modification time, different content
+    stat = os.stat(zero_log)
+    rewritten = [ZERO_FAST_DATA_EXPORT[0], ['1/16/21', '20:05', '09:05', '13', '2']]
+    write_export(zero_log, rewritten)
+    os.utime(zero_log, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(zero_log).st_size == stat.st_size
+    assert cache.zero_fasts(zero_log).end_dt.iloc[0] == pd.Timestamp('1/17/21 09:05')
+
+
+def test_results_do_not_corrupt_cache(zero_log):
+    cache = ExportCache()
+    timeline = cache.continuous_fasts(zero_log, compact=True)
+    with pytest.raises(ValueError):
+        timeline.run_starts[0] = 5
+    daily = cache.daily_metrics(zero_log)
+    daily.iloc[0, 0] = -1
+    assert cache.daily_metrics(zero_log).iloc[0, 0] >= 0
+    assert cache.continuous_fasts(zero_log, compact=True) == timeline
+
+
+def test_memory_eviction(tmpdir, mocker):
+    exports = []
+    for night_eating in ['0', '1', '2']:  # Different content, same discrete log
+        export = [row[:4] + [night_eating] for row in ZERO_FAST_DATA_EXPORT]
+        exports.append(write_export(str(tmpdir.join(f'data_{night_eating}.csv')), export))
+
+    parse = mocker.spy(quantify, 'zero_fasts')
+    cache = ExportCache(max_bytes=40)  # Room for one discrete log of 2 fasts (32 bytes)
+    for filename in exports:
+        cache.zero_fasts(filename)
+    assert cache.memory_bytes <= 40
+    assert parse.call_count == 3
+
+    # The most recent entry is kept, older entries were evicted and are parsed again
+    cache.zero_fasts(exports[-1])
+    assert parse.call_count == 3
+    cache.zero_fasts(exports[0])
+    assert parse.call_count == 4
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.cohort` module."""
+
+import pytest
+from fasting import cohort
+from fasting import quantify
+import pandas as pd
+from tests.conftest import ZERO_FAST_DATA_EXPORT, ZERO_FAST_DATA_EXPORT_LONG, ZERO_FAST_DATA_EXPORT_OVERLAPPING
+from tests.conftest import write_export
+
+
+@pytest.fixture(scope='session')
+def exports(tmpdir_factory):
+    data = tmpdir_factory.mktemp('data')
+    user_exports = {}
+    for user_id, export in [('a', ZERO_FAST_DATA_EXPORT),
+                            ('b', ZERO_FAST_DATA_EXPORT_LONG),
+                            ('overlapping', ZERO_FAST_DATA_EXPORT_OVERLAPPING)]:
+        user_exports[user_id] = write_export(str(data.join(f'{user_id}.csv')), export)
+    user_exports['missing'] = str(data.join('missing.csv'))
+    return user_exports
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cohort_daily_metrics(exports, workers):
+    metrics, failures = cohort.cohort_daily_metrics(exports, workers=workers, chunksize=2)
+
+    assert list(metrics.columns) == cohort.METRIC_COLUMNS
+    assert list(failures.columns) == cohort.FAILURE_COLUMNS
+    assert set(failures.user_id) == {'overlapping', 'missing'}
+    assert failures.set_index('user_id').at['overlapping', 'error'].startswith('ValueError')
+
+    # Each user's metrics match the single user pipeline
+    for user_id in ['a', 'b']:
+        continuous_log = quantify.continuous_fasts(quantify.zero_fasts(exports[user_id]))
+        user_metrics = metrics[metrics.user_id == user_id].set_index('date')
+        assert (user_metrics.cumulative_hours.values ==
+                quantify.daily_cumulative_hours(continuous_log).values).all()
+        assert (user_metrics.max_consecutive_hours.values ==
+                quantify.daily_max_consecutive_hours(continuous_log).values).all()
+        assert user_metrics.index.equals(quantify.daily_cumulative_hours(continuous_log).index)
+
+
+def test_cohort_daily_metrics_all_failures(exports):
+    metrics, failures = cohort.cohort_daily_metrics({'missing': exports['missing']}, workers=1)
+    assert metrics.empty
+    assert list(metrics.columns) == cohort.METRIC_COLUMNS
+    assert list(failures.user_id) == ['missing']
+
+
+def test_cohort_daily_metrics_repair(exports):
+    metrics, failures = cohort.cohort_daily_metrics(exports, workers=1, repair='union')
+    assert set(failures.user_id) == {'missing'}
+    repaired, _ = quantify.repair_discrete_fasts(quantify.zero_fasts(exports['overlapping']))
+    user_metrics = metrics[metrics.user_id == 'overlapping']
+    assert (user_metrics.cumulative_hours.values ==
+            quantify.daily_cumulative_hours(repaired, discrete=True).values).all()
+
+    # An unknown policy fails the call up front instead of failing every user
+    with pytest.raises(ValueError):
+        cohort.cohort_daily_metrics(exports, workers=1, repair='merge')
+    with pytest.raises(ValueError):
+        cohort.cohort_aggregate(exports, workers=1, repair='merge')
+    with pytest.raises(ValueError):
+        cohort.process_user(('a', exports['a']), repair='merge')
+
+
+def test_cohort_aggregate(exports):
+    users = {user_id: quantify.zero_fasts(exports[user_id]) for user_id in ['a', 'b']}
+
+    for period, minutes in [('day', 24 * 60), ('week', 7 * 24 * 60)]:
+        aggregate = cohort.CohortAggregate(period=period)
+        for fasts in users.values():
+            aggregate.add(fasts)
+        assert aggregate.users == 2
+
+        # Same as grouping the continuous logs by minute of the period
+        fasting = pd.Series(0, index=range(minutes))
+        observed = pd.Series(0, index=range(minutes))
+        for fasts in users.values():
+            continuous_log = quantify.continuous_fasts(fasts)
+            index = continuous_log.index
+            minute = index.hour * 60 + index.minute
+            if period == 'week':
+                minute += index.dayofweek * 24 * 60
+            fasting = fasting.add(continuous_log.groupby(minute).sum(), fill_value=0)
+            observed = observed.add(continuous_log.groupby(minute).size(), fill_value=0)
+        assert (aggregate.fasting_minutes == fasting.values).all()
+        assert (aggregate.observed_minutes == observed.values).all()
+        fraction = aggregate.fraction_fasting()
+        assert len(fraction) == minutes
+        assert fraction.index[-1] == pd.Timedelta(minutes=minutes - 1)
+
+    # Daily hours distribution
+    aggregate = cohort.CohortAggregate(hours_bin=6)
+    for fasts in users.values():
+        aggregate.add(fasts)
+    distribution = aggregate.daily_hours_distribution()
+    daily_hours = pd.concat([quantify.daily_cumulative_hours(fasts, discrete=True) for fasts in users.values()])
+    assert distribution.user_days.sum() == len(daily_hours)
+    assert distribution.user_days.tolist() == (daily_hours // 6).value_counts().reindex(range(5), fill_value=0).tolist()
+    assert distribution.users.sum() == 2
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cohort_aggregate_merge(exports, workers):
+    aggregate, failures = cohort.cohort_aggregate(exports, workers=workers, chunksize=1)
+    assert set(failures.user_id) == {'overlapping', 'missing'}
+
+    expected = cohort.CohortAggregate()
+    expected.add(quantify.zero_fasts(exports['a']))
+    partial = cohort.CohortAggregate()
+    partial.add(quantify.zero_fasts(exports['b']))
+    expected = expected + partial
+    assert aggregate.users == expected.users == 2
+    assert (aggregate.fasting_minutes == expected.fasting_minutes).all()
+    assert aggregate.daily_hours_distribution().equals(expected.daily_hours_distribution())
+
+    with pytest.raises(ValueError):
+        assert aggregate.merge(cohort.CohortAggregate(period='week'))
@@ -2,12 +2,20 @@
 
 """Tests for `fasting` package."""
 
+import subprocess
+import sys
+from concurrent.futures import Future
+
 import pytest
 
 from click.testing import CliRunner
 
 from fasting import fasting
 from fasting import cli
+from fasting import cohort
+import pandas as pd
+from tests.conftest import ZERO_FAST_DATA_EXPORT, ZERO_FAST_DATA_EXPORT_LONG, ZERO_FAST_DATA_EXPORT_OVERLAPPING
+from tests.conftest import write_export
 
 
 @pytest.fixture
@@ -30,8 +38,80 @@ def test_command_line_interface():
     """Test the CLI."""
     runner = CliRunner()
     result = runner.invoke(cli.main)
-    assert result.exit_code == 0
-    assert 'fasting.cli.main' in result.output
+    assert result.exit_code == 2  # Missing PATHS
     help_result = runner.invoke(cli.main, ['--help'])
     assert help_result.exit_code == 0
-    assert '--help  Show this message and exit.' in help_result.output
+    assert '--help' in help_result.output and 'Show this message and exit.' in help_result.output
+
+
+@pytest.fixture
+def exports(tmpdir):
+    data = tmpdir.mkdir('exports')
+    for user_id, export in [('a', ZERO_FAST_DATA_EXPORT), ('b', ZERO_FAST_DATA_EXPORT_LONG)]:
+        write_export(str(data.join(f'{user_id}.csv')), export)
+    return data
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_command_line_batch(exports, tmpdir, jobs):
+    runner = CliRunner()
+    output = str(tmpdir.join('metrics.csv'))
+    result = runner.invoke(cli.main, [str(exports), '--output', output, '--jobs', jobs])
+    assert result.exit_code == 0
+    assert 'exports/s' in result.output
+
+    metrics = pd.read_csv(output, parse_dates=['date'])
+    expected, _ = cohort.cohort_daily_metrics({'a': str(exports.join('a.csv')), 'b': str(exports.join('b.csv'))},
+                                              workers=1)
+    pd.testing.assert_frame_equal(metrics, expected)
+
+    # A failed export is reported and sets the exit status, other exports are still written
+    write_export(str(exports.join('c.csv')), ZERO_FAST_DATA_EXPORT_OVERLAPPING)
+    result = runner.invoke(cli.main, [str(exports), '--output', output, '--jobs', jobs, '--quiet'])
+    assert result.exit_code == 1
+    assert 'c: failed, ValueError' in result.output
+    assert pd.read_csv(output).user_id.unique().tolist() == ['a', 'b']
+
+
+def test_bounded_map():
+    # At most window exports are submitted ahead of the result being written, results stay in order
+    submitted = []
+
+    class Executor:
+        def submit(self, function, item):
+            submitted.append(item)
+            future = Future()
+            future.set_result(function(item))
+            return future
+
+    results = cli._bounded_map(Executor(), lambda item: item * 2, range(10), window=3)
+    assert next(results) == 0
+    assert submitted == [0, 1, 2]
+    assert list(results) == [item * 2 for item in range(1, 10)]
+
+
+def test_command_line_parquet(exports, tmpdir):
+    pytest.importorskip('pyarrow')
+    runner = CliRunner()
+    output = str(tmpdir.join('metrics.parquet'))
+    result = runner.invoke(cli.main, [str(exports.join('a.csv')), '--output', output])
+    assert result.exit_code == 0
+    metrics = pd.read_parquet(output)
+    assert list(metrics.columns) == cohort.METRIC_COLUMNS
+    assert set(metrics.user_id) == {'a'}
+
+
+def imported_modules(statement):
+    """Names of the modules imported by a statement, in a fresh interpreter."""
+    script = f'import sys; {statement}; print(" ".join(sys.modules), file=sys.stderr)'
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return set(result.stderr.split())
+
+
+def test_lazy_imports():
+    """Importing the package and the console script does not import pandas, submodules load on first access."""
+    for statement in ['import fasting', 'import fasting.cli; fasting.cli.main(["--help"], standalone_mode=False)']:
+        modules = imported_modules(statement)
+        assert not {'pandas', 'numpy', 'fasting.quantify'} & modules
+
+    assert {'fasting.quantify', 'pandas'} <= imported_modules('import fasting; fasting.quantify')
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.incremental` module."""
+
+import pytest
+from fasting import quantify
+from fasting.incremental import FastingState, WindowedDailyMetrics
+from fasting.incremental import continuous_chunks, windowed_daily_metrics
+import pandas as pd
+from tests.conftest import FAST_STARTS, FAST_ENDS, discrete_log
+
+
+@pytest.fixture(scope='session')
+def discrete():
+    # Three more fasts: back to back with the second fast, spanning midnight, and after a day without fasting
+    return discrete_log(FAST_STARTS + ['1/18/21 12:16:00', '1/19/21 23:00:00', '1/21/21 18:30:00'],
+                        FAST_ENDS + ['1/19/21 08:00:00', '1/20/21 14:00:00', '1/22/21 11:00:00'])
+
+
+@pytest.mark.parametrize('initial_fasts', [1, 2, 3, 4])
+def test_append_matches_full_recompute(discrete, initial_fasts):
+    state, continuous_log, cumulative_hours, max_consecutive_hours = \
+        FastingState.from_discrete(discrete.iloc[:initial_fasts])
+
+    # Append the remaining fasts one at a time
+    for index in range(initial_fasts, len(discrete)):
+        continuous_tail, cumulative_update, max_update = state.append(discrete.iloc[[index]])
+        continuous_log = pd.concat([continuous_log, continuous_tail])
+        cumulative_hours = cumulative_update.combine_first(cumulative_hours)
+        max_consecutive_hours = max_update.combine_first(max_consecutive_hours)
+
+    expected_log = quantify.continuous_fasts(discrete)
+    assert continuous_log.equals(expected_log)
+    assert cumulative_hours.equals(quantify.daily_cumulative_hours(expected_log))
+    assert max_consecutive_hours.equals(quantify.daily_max_consecutive_hours(expected_log))
+    assert state.last_timestamp == expected_log.index[-1]
+    assert state.trailing_run == quantify.consecutive_minutes(expected_log).iloc[-1]
+
+
+def test_append_only_recalculates_affected_days(discrete):
+    state, _, _, _ = FastingState.from_discrete(discrete.iloc[:4])
+    _, cumulative_update, max_update = state.append(discrete.iloc[4:])
+    assert list(cumulative_update.index) == list(pd.date_range('1/20/21', '1/22/21', freq='1D'))
+    minutes_per_hour = 60
+    expected_minutes = [841, 330, 661]  # 1/20 00:00-14:00, 1/21 18:30-23:59, 1/22 00:00-11:00
+    assert list(cumulative_update.values) == [value / minutes_per_hour for value in expected_minutes]
+
+
+def test_append_overlapping(discrete):
+    state, _, _, _ = FastingState.from_discrete(discrete.iloc[:2])
+    with pytest.raises(ValueError):
+        assert state.append(discrete.iloc[:1])
+
+
+@pytest.mark.parametrize('window', ['97T', '7H', '1D', '30D'])
+@pytest.mark.parametrize('compact', [False, True])
+def test_windowed_daily_metrics(discrete, window, compact):
+    chunks = continuous_chunks(discrete, window=window, compact=compact)
+    daily = pd.concat(list(windowed_daily_metrics(chunks)))
+
+    expected_log = quantify.continuous_fasts(discrete)
+    expected_cumulative = quantify.daily_cumulative_hours(expected_log)
+    expected_max = quantify.daily_max_consecutive_hours(expected_log)
+    assert daily.index.equals(expected_cumulative.index)
+    assert (daily.cumulative_hours.values == expected_cumulative.values).all()
+    assert (daily.max_consecutive_hours.values == expected_max.values).all()
+
+
+def test_windowed_daily_metrics_chunks(discrete):
+    # Chunks of a loaded continuous log, ending exactly at midnight and mid-run
+    continuous_log = quantify.continuous_fasts(discrete)
+    midnight = continuous_log.index.get_loc(pd.Timestamp('1/18/21'))
+    windowed = WindowedDailyMetrics()
+    assert windowed.update(continuous_log.iloc[:midnight]).index.tolist() == [pd.Timestamp('1/16/21')]
+    assert windowed.update(continuous_log.iloc[midnight:midnight + 1]).index.tolist() == [pd.Timestamp('1/17/21')]
+    assert windowed.trailing_run == quantify.consecutive_minutes(continuous_log).iloc[midnight]
+    remaining = windowed.update(continuous_log.iloc[midnight + 1:])
+    assert len(remaining) + len(windowed.finish()) == 5
+    assert windowed.finish().empty
+
+    # Chunks must be consecutive
+    windowed = WindowedDailyMetrics()
+    windowed.update(continuous_log.iloc[:10])
+    with pytest.raises(ValueError):
+        assert windowed.update(continuous_log.iloc[11:20])
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.profiling` module."""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from fasting import backends
+from fasting import profiling
+from fasting import quantify
+from fasting import synthetic
+
+
+def test_profile(tmpdir, monkeypatch):
+    monkeypatch.setattr(backends, '_backend', 'pandas')  # Stages of the pandas backend, whatever FASTING_BACKEND is
+    fasts = synthetic.discrete_log(years=1, seed=0)
+    path = str(tmpdir.join('export.csv'))
+    synthetic.zero_export(fasts).to_csv(path, index=False)
+
+    records = []
+    with profiling.profile(memory=True, callback=records.append) as run:
+        quantify.daily_cumulative_hours(quantify.continuous_fasts(quantify.zero_fasts(path)))
+    assert records == run.records
+
+    names = [record.name for record in run.records]
+    assert names == ['zero_fasts/read_csv', 'zero_fasts/parse', 'zero_fasts',
+                     'continuous_fasts/validate_discrete_fasts', 'continuous_fasts/date_range',
+                     'continuous_fasts/fill', 'continuous_fasts',
+                     'daily_cumulative_hours/validate_continuous_fasts', 'daily_cumulative_hours/resample',
+                     'daily_cumulative_hours']
+    records = {record.name: record for record in run.records}
+    assert records['zero_fasts'].rows_in is None  # File path
+    assert records['zero_fasts'].rows_out == len(fasts)
+    assert records['continuous_fasts'].rows_in == len(fasts)
+    assert records['continuous_fasts/fill'].depth == 1
+    minutes = records['continuous_fasts'].rows_out
+    assert records['daily_cumulative_hours'].rows_in == minutes
+
+    # Peaks of enclosing calls include the peaks of their stages
+    assert all(record.peak_bytes >= 0 for record in run.records)
+    assert records['continuous_fasts'].peak_bytes >= records['continuous_fasts/fill'].peak_bytes
+
+    report = run.report()
+    assert report.at['zero_fasts', 'calls'] == 1
+    assert list(report.columns) == ['calls', 'seconds', 'rows_in', 'rows_out', 'peak_mib']
+
+    # Disabled outside the context
+    quantify.zero_fasts(path)
+    assert len(run.records) == len(names)
+
+
+def test_profile_environment_variable(tmpdir):
+    path = str(tmpdir.join('export.csv'))
+    synthetic.zero_export(synthetic.discrete_log(years=1, seed=0)).to_csv(path, index=False)
+    script = f"from fasting import quantify; quantify.summary(quantify.zero_fasts({path!r}))"
+    environment = dict(os.environ, **{profiling.PROFILE_ENV: '1'})
+    result = subprocess.run([sys.executable, '-c', script], env=environment, capture_output=True, text=True)
+    assert result.returncode == 0
+    assert 'summary' in result.stderr and 'zero_fasts/read_csv' in result.stderr
+
+
+@pytest.mark.skipif(sys.version_info < (3, 9), reason='Stage peaks below an earlier peak require Python 3.9+')
+def test_profile_memory_peaks():
+    fasts = synthetic.discrete_log(years=1, seed=0)
+    bytes_before = bytearray(2 ** 26)  # Earlier peak of the process, larger than the peaks of the stages
+    del bytes_before
+    with profiling.profile(memory=True) as run:
+        continuous_log = quantify.continuous_fasts(fasts)
+    records = {record.name: record for record in run.records}
+    assert records['continuous_fasts/fill'].peak_bytes >= len(continuous_log) * 8
+
+
+def test_profile_memory_without_reset_peak(monkeypatch):
+    # Python 3.7 and 3.8: peaks are still recorded, bounded below by the memory in use
+    monkeypatch.setattr(profiling, '_RESET_PEAK', False)
+    with profiling.profile(memory=True) as run:
+        quantify.continuous_fasts(synthetic.discrete_log(years=1, seed=0))
+    assert all(record.peak_bytes is not None and record.peak_bytes >= 0 for record in run.records)
+
+
+def test_profile_threads_and_chunks(tmpdir):
+    fasts = synthetic.discrete_log(years=1, seed=0)
+    path = str(tmpdir.join('export.csv'))
+    synthetic.zero_export(fasts).to_csv(path, index=False)
+
+    # Each thread nests its own stages
+    with profiling.profile() as run:
+        threads = [threading.Thread(target=quantify.summary, args=(fasts,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    summaries = [record for record in run.records if record.name == 'summary']
+    assert len(summaries) == 4 and all(record.depth == 0 for record in summaries)
+    assert all(record.name.startswith('summary/') for record in run.records if record.depth > 0)
+
+    # Chunks are profiled as they are read and parsed, not when zero_fasts() returns
+    with profiling.profile() as run:
+        chunks = list(quantify.zero_fasts(path, chunksize=100))
+    names = [record.name for record in run.records]
+    assert names.count('zero_fasts/parse') == len(chunks)
+    assert sum(record.rows_in for record in run.records if record.name == 'zero_fasts/parse') == len(fasts)
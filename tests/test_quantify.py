@@ -3,19 +3,18 @@
 """Tests for `fasting` package."""
 
 import pytest
+from fasting import _intervals
 from fasting import quantify
+import numpy as np
 import pandas as pd
+from tests.conftest import FAST_STARTS, FAST_ENDS, ZERO_FAST_DATA_EXPORT, discrete_log
 
-FAST_STARTS = ['1/16/21 20:05:00', '1/17/21 12:15:00']
-FAST_ENDS = ['1/17/21 10:05:00', '1/18/21 12:15:00']
-ZERO_FAST_DATA_EXPORT = [['2/12/21', '9:55', '0'],
-                         ['1/17/21', '12:15', '12:15', '24', '1'],
-                         ['1/16/21', '20:05', '10:05', '14', '2']]
+ZERO_FAST_DATA_EXPORT_INCOMPLETE = [['2/12/21', '9:55', '0']] + ZERO_FAST_DATA_EXPORT  # Newest fast not complete
 
 
 @pytest.fixture(scope='session')
 def zero_log(tmpdir_factory):
-    dataframe = pd.DataFrame(ZERO_FAST_DATA_EXPORT,
+    dataframe = pd.DataFrame(ZERO_FAST_DATA_EXPORT_INCOMPLETE,
                              columns=['Date', 'Start', 'End', 'Hours', 'Night Eating']
                              )
     filename = str(tmpdir_factory.mktemp('data').join('data.csv'))
@@ -25,7 +24,7 @@ def zero_log(tmpdir_factory):
 
 @pytest.fixture(scope='session')
 def zero_log_false(tmpdir_factory):
-    dataframe = pd.DataFrame(ZERO_FAST_DATA_EXPORT,
+    dataframe = pd.DataFrame(ZERO_FAST_DATA_EXPORT_INCOMPLETE,
                              columns=['Date', 'Start', 'End', 'hrs', 'Night Eating']
                              )
     filename = str(tmpdir_factory.mktemp('data').join('data.csv'))
@@ -33,14 +32,6 @@ def zero_log_false(tmpdir_factory):
     return filename
 
 
-@pytest.fixture(scope='session')
-def discrete():
-    discrete_log = {'start_dt': FAST_STARTS,
-                    'end_dt': FAST_ENDS}
-    discrete_data = pd.DataFrame(data=discrete_log, dtype='datetime64[ns]')
-    return discrete_data
-
-
 @pytest.fixture(scope='session')
 def continuous():
     datetime_range = pd.date_range(start=FAST_STARTS[0], end=FAST_ENDS[1], freq='1T')
@@ -104,6 +95,23 @@ def test_load_zero(zero_log, zero_log_false, discrete):
         assert quantify.zero_fasts(zero_log_false)
 
 
+def test_load_zero_chunks(zero_log, discrete, tmpdir):
+    # Chunks are in file order (newest first), each chunk oldest to newest
+    chunks = list(quantify.zero_fasts(zero_log, chunksize=2))
+    assert len(chunks) == 2
+    output = pd.concat(chunks).sort_values(by='start_dt', ignore_index=True)
+    assert output.equals(discrete)
+
+    # Exports concatenated into one file, header row repeated
+    with open(zero_log) as export:
+        contents = export.read()
+    concatenated = str(tmpdir.join('concatenated.csv'))
+    with open(concatenated, 'w') as export:
+        export.write(contents + contents)
+    output = quantify.zero_fasts(concatenated)
+    assert output.equals(pd.concat([discrete, discrete], ignore_index=True))
+
+
 def test_validate_discrete_fasts(discrete):
     # Positive test
     assert quantify.validate_discrete_fasts(fasts=discrete, start_col='start_dt', end_col='end_dt')
@@ -143,6 +151,29 @@ def test_continuous_fasts(discrete, continuous, mocker):
     assert output.equals(continuous)
 
 
+def loop_continuous_fasts(fasts, start_col='start_dt', end_col='end_dt', freq='1T'):
+    # Reference implementation: label slice assignment for each fast
+    fasts = fasts.sort_values(by=start_col, ascending=True, ignore_index=True)
+    time_range = pd.date_range(start=fasts[start_col].iloc[0], end=fasts[end_col].max(), freq=freq)
+    log = pd.Series(0, index=time_range)
+    for index, row in fasts.iterrows():
+        log[row[start_col]:row[end_col]] = 1
+    return log
+
+
+def test_continuous_fasts_matches_loop(discrete, discrete_random):
+    for fasts in [discrete, discrete_random]:
+        expected = loop_continuous_fasts(fasts)
+        output = quantify.continuous_fasts(fasts=fasts)
+        assert output.equals(expected)
+
+    # Timestamps that are not on the minute grid of the first fast
+    off_grid = discrete.copy()
+    off_grid.at[1, 'start_dt'] += pd.Timedelta(seconds=30)
+    off_grid.at[1, 'end_dt'] += pd.Timedelta(seconds=30)
+    assert quantify.continuous_fasts(fasts=off_grid).equals(loop_continuous_fasts(off_grid))
+
+
 def test_validate_continuous_fasts(continuous):
     # Positive test
     assert quantify.validate_continuous_fasts(continuous)
@@ -215,3 +246,335 @@ def test_daily_max_consecutive_hours(continuous_short, continuous_short_consecut
     # Positive test
     output = quantify.daily_max_consecutive_hours(continuous_short)
     assert list(output) == expected_maximum_hours
+
+
+def test_daily_hours_discrete(discrete, discrete_random):
+    off_grid = discrete.copy()
+    off_grid.at[1, 'start_dt'] += pd.Timedelta(seconds=30)
+    off_grid.at[1, 'end_dt'] += pd.Timedelta(seconds=30)
+
+    for fasts in [discrete, discrete_random, off_grid]:
+        continuous_log = quantify.continuous_fasts(fasts)
+
+        expected_cumulative = quantify.daily_cumulative_hours(continuous_log)
+        output_cumulative = quantify.daily_cumulative_hours(fasts, discrete=True)
+        assert output_cumulative.equals(expected_cumulative)
+
+        expected_maximum = quantify.daily_max_consecutive_hours(continuous_log)
+        output_maximum = quantify.daily_max_consecutive_hours(fasts, discrete=True)
+        assert output_maximum.equals(expected_maximum)
+
+    # Days are grouped on naive datetimes, timezone aware logs are rejected instead of grouped by UTC day
+    aware = discrete.apply(lambda column: column.dt.tz_localize('America/New_York'))
+    for function in [quantify.daily_cumulative_hours, quantify.daily_max_consecutive_hours]:
+        with pytest.raises(ValueError, match='timezone naive'):
+            function(aware, discrete=True)
+    wall_clock = aware.apply(lambda column: column.dt.tz_localize(None))
+    expected = quantify.daily_cumulative_hours(discrete, discrete=True)
+    assert quantify.daily_cumulative_hours(wall_clock, discrete=True).equals(expected)
+
+
+def test_validate_fasts_single_pass(discrete, continuous):
+    # Unsorted discrete logs are validated without sorting the DataFrame
+    unsorted = discrete.iloc[::-1]
+    assert quantify.validate_discrete_fasts(fasts=unsorted)
+    overlapping = unsorted.copy()
+    overlapping.iloc[0, 0] = discrete.at[0, 'end_dt'] - pd.Timedelta(minutes=1)  # start latest fast before previous end
+    with pytest.raises(ValueError):
+        assert quantify.validate_discrete_fasts(fasts=overlapping)
+
+    # Continuous logs without a set index frequency, or with boolean values
+    no_freq = pd.Series(continuous.values, index=pd.DatetimeIndex(list(continuous.index)))
+    assert no_freq.index.freq is None
+    assert quantify.validate_continuous_fasts(no_freq)
+    assert quantify.validate_continuous_fasts(continuous.astype(bool))
+    with pytest.raises(ValueError):
+        assert quantify.validate_continuous_fasts(no_freq.drop(no_freq.index[10]))
+
+
+def test_validate_false_skips_validation(discrete, continuous, mocker):
+    mocker.patch.object(quantify, "validate_discrete_fasts", side_effect=AssertionError)
+    mocker.patch.object(quantify, "validate_continuous_fasts", side_effect=AssertionError)
+
+    assert quantify.continuous_fasts(discrete, validate=False).equals(continuous)
+    quantify.consecutive_minutes(continuous, validate=False)
+    quantify.daily_cumulative_hours(continuous, validate=False)
+    quantify.daily_max_consecutive_hours(continuous, validate=False)
+    quantify.daily_cumulative_hours(discrete, discrete=True, validate=False)
+    quantify.daily_max_consecutive_hours(discrete, discrete=True, validate=False)
+
+
+def test_chained_calls_validate_once(continuous, mocker):
+    validate = mocker.spy(quantify, "validate_continuous_fasts")
+    quantify.daily_max_consecutive_hours(continuous)
+    assert validate.call_count == 1
+
+
+def test_consecutive_minutes_matches_groupby(discrete_random):
+    continuous_log = quantify.continuous_fasts(discrete_random)
+    expected = continuous_log.groupby((continuous_log != continuous_log.shift()).cumsum()).cumcount() + 1
+    expected[continuous_log == 0] = 0
+    assert quantify.consecutive_minutes(continuous_log).equals(expected)
+
+
+def test_fast_durations(discrete, continuous):
+    expected_hours = [14.0, 24.0]
+
+    output = quantify.fast_durations(discrete, discrete=True)
+    assert list(output.columns) == ['start_dt', 'end_dt', 'hours']
+    assert output[['start_dt', 'end_dt']].equals(discrete)
+    assert list(output.hours) == expected_hours
+
+    # Same fasts from the continuous log, as a Series or a FastingTimeline
+    assert quantify.fast_durations(continuous).equals(output)
+    compact = quantify.continuous_fasts(discrete, compact=True)
+    assert quantify.fast_durations(compact).equals(output)
+
+    # Back to back fasts are combined in a continuous log
+    back_to_back = pd.DataFrame({'start_dt': pd.to_datetime(['1/1/21 20:00', '1/2/21 08:01']),
+                                 'end_dt': pd.to_datetime(['1/2/21 08:00', '1/2/21 12:00'])})
+    output = quantify.fast_durations(quantify.continuous_fasts(back_to_back))
+    assert list(output.hours) == [16.0]
+
+
+def test_fasting_zone(discrete):
+    # Fast 0: 14 hours, fast 1: 24 hours
+    output = quantify.fasting_zone(discrete)
+    assert list(output.columns) == ['fast', 'zone', 'start_dt', 'end_dt']
+    assert list(output.fast) == [0, 0, 1, 1, 1]
+    assert list(output.zone) == ['anabolic', 'catabolic', 'anabolic', 'catabolic', 'fat burning']
+    assert output.start_dt.iloc[1] == pd.Timestamp('1/17/21 00:05:00')
+    assert output.end_dt.iloc[-1] == pd.Timestamp(FAST_ENDS[1])
+
+    # Custom zones, in any order
+    output = quantify.fasting_zone(discrete, zones={'long': 20, 'short': 0})
+    assert list(output.zone) == ['short', 'short', 'long']
+
+
+def test_daily_zone_minutes(discrete):
+    output = quantify.daily_zone_minutes(discrete)
+    assert list(output.columns) == list(quantify.FASTING_ZONES)
+    assert list(output.index) == list(pd.date_range('1/16/21', '1/18/21', freq='1D'))
+    assert list(output.anabolic) == [235.0, 5.0 + 240.0, 0.0]
+    assert list(output.catabolic) == [0.0, 600.0 + 465.0, 255.0]
+    assert list(output['fat burning']) == [0.0, 0.0, 480.0]
+
+    # Each day's total is the time fasted that day
+    fasted_minutes = (discrete.end_dt - discrete.start_dt).sum() / pd.Timedelta(minutes=1)
+    assert output.values.sum() == fasted_minutes
+
+    # Days east of UTC start before UTC midnight, timezone aware logs are rejected instead of split at UTC midnight
+    tokyo = discrete_log(['1/17/21 05:00:00', '1/18/21 05:00:00'], ['1/17/21 06:00:00', '1/18/21 09:00:00'])
+    assert list(quantify.daily_zone_minutes(tokyo).anabolic) == [60.0, 240.0]
+    with pytest.raises(ValueError, match='timezone naive'):
+        quantify.daily_zone_minutes(tokyo.apply(lambda column: column.dt.tz_localize('Asia/Tokyo')))
+
+
+def test_summary(discrete, continuous):
+    output = quantify.summary(discrete)
+
+    assert output.durations.equals(quantify.fast_durations(discrete, discrete=True))
+    assert output.daily.cumulative_hours.equals(quantify.daily_cumulative_hours(continuous).rename('cumulative_hours'))
+    assert output.daily.max_consecutive_hours.equals(
+        quantify.daily_max_consecutive_hours(continuous).rename('max_consecutive_hours'))
+
+    assert output.stats['fasts'] == 2
+    assert output.stats['days'] == 3
+    assert output.stats['total_hours'] == 38.0
+    # Daily hours count the start and end minute of each fast
+    assert output.daily.cumulative_hours.sum() == pytest.approx(38.0 + 2 / 60)
+    assert output.stats['average_fast_hours'] == 19.0
+    assert output.stats['longest_fast_hours'] == 24.0
+    assert output.stats['average_cumulative_hours'] == output.daily.cumulative_hours.mean()
+
+
+def test_summary_validates_once(discrete, mocker):
+    validate = mocker.spy(quantify, "validate_discrete_fasts")
+    quantify.summary(discrete.iloc[::-1])
+    assert validate.call_count == 1
+
+
+def test_freq(discrete, discrete_random):
+    for freq in ['15T', '30S', '1H']:
+        expected = loop_continuous_fasts(discrete_random, freq=freq)
+        output = quantify.continuous_fasts(discrete_random, freq=freq)
+        assert output.equals(expected)
+        timeline = quantify.continuous_fasts(discrete_random, compact=True, freq=freq)
+        assert timeline.to_series().equals(expected)
+
+        # Time steps are scaled to hours by their length, for continuous logs and timelines alike
+        step_hours = pd.Timedelta(freq) / pd.Timedelta(hours=1)
+        cumulative = quantify.daily_cumulative_hours(output, freq=freq)
+        assert np.allclose(cumulative, output.resample('1D').sum() * step_hours)
+        assert quantify.daily_cumulative_hours(timeline, freq=freq).equals(cumulative)
+        max_consecutive = quantify.daily_max_consecutive_hours(output, freq=freq)
+        assert quantify.daily_max_consecutive_hours(timeline, freq=freq).equals(max_consecutive)
+        assert quantify.fast_durations(timeline, freq=freq).equals(quantify.fast_durations(output, freq=freq))
+        assert quantify.summary(discrete_random, freq=freq).daily.cumulative_hours.equals(cumulative)
+
+    # Whole minute time steps keep integer minutes, matching the 1 minute log of fasts on the time step grid
+    quarter_hours = quantify.consecutive_minutes(quantify.continuous_fasts(discrete, freq='15T'), freq='15T')
+    assert quarter_hours.dtype == 'int64'
+    assert quarter_hours.max() % 15 == 0
+
+    # Frequency must match the expected frequency
+    assert quantify.validate_continuous_fasts(quantify.continuous_fasts(discrete, freq='15T'), freq='15T')
+    with pytest.raises(ValueError):
+        assert quantify.validate_continuous_fasts(quantify.continuous_fasts(discrete, freq='15T'))
+    with pytest.raises(ValueError):
+        assert quantify.daily_cumulative_hours(quantify.continuous_fasts(discrete, compact=True), freq='15T')
+
+
+def test_fasting_state(discrete, discrete_random):
+    for fasts in [discrete, discrete_random]:
+        # Irregular timestamps, unsorted, on and off the minute grid of the first fast
+        rng = np.random.default_rng(1)
+        first, last = fasts.start_dt.min().value, fasts.end_dt.max().value
+        offsets = rng.integers(-10 ** 12, last - first + 10 ** 12, size=1000)
+        timestamps = pd.DatetimeIndex(np.concatenate([first + offsets, fasts.start_dt.values.view('int64'),
+                                                      fasts.end_dt.values.view('int64')]))
+        output = quantify.fasting_state(fasts, timestamps)
+        assert output.index.equals(timestamps)
+
+        # Same fasting status as the continuous log, without creating it
+        minute_timestamps = timestamps[(timestamps.asi8 - first) % (60 * 10 ** 9) == 0]
+        continuous_log = quantify.continuous_fasts(fasts)
+        expected = continuous_log.reindex(minute_timestamps, fill_value=0)
+        assert (output.fasting.loc[minute_timestamps].values == expected.values).all()
+
+        # Each fasting timestamp is within its fast, elapsed minutes are measured from the fast start
+        fasting = output[output.fasting == 1]
+        assert (fasting.index >= fasts.start_dt.values[fasting.fast]).all()
+        assert (fasting.index <= fasts.end_dt.values[fasting.fast]).all()
+        elapsed = (fasting.index - fasts.start_dt.values[fasting.fast]) / pd.Timedelta(minutes=1)
+        assert np.allclose(fasting.elapsed_minutes, elapsed)
+        not_fasting = output[output.fasting == 0]
+        assert (not_fasting.fast == -1).all() and (not_fasting.elapsed_minutes == 0).all()
+
+    # The end of a fast and the start of a back to back fast belongs to the later fast
+    back_to_back = pd.DataFrame({'start_dt': pd.to_datetime(['1/1/21 20:00', '1/2/21 08:00']),
+                                 'end_dt': pd.to_datetime(['1/2/21 08:00', '1/2/21 12:00'])})
+    output = quantify.fasting_state(back_to_back, ['1/2/21 08:00', '1/2/21 12:00', '1/2/21 12:01'])
+    assert output.fast.tolist() == [1, 1, -1]
+    assert output.elapsed_minutes.tolist() == [0, 240, 0]
+
+
+def test_rolling_adherence(discrete, discrete_random):
+    for fasts in [discrete, discrete_random]:
+        output = quantify.rolling_adherence(fasts, windows=(1, 3, 7, 30), goal_hours=14)
+        cumulative = quantify.daily_cumulative_hours(fasts, discrete=True)
+        max_consecutive = quantify.daily_max_consecutive_hours(fasts, discrete=True)
+        assert output.index.equals(cumulative.index)
+
+        goal_met = max_consecutive >= 14
+        for window in (1, 3, 7, 30):
+            rolling = f'{window}D'
+            assert np.allclose(output[f'average_hours_{window}d'], cumulative.rolling(rolling).mean())
+            assert np.allclose(output[f'goal_share_{window}d'], goal_met.astype(int).rolling(rolling).mean())
+
+            # Longest streak: brute force over each window
+            met = goal_met.values
+            expected = []
+            for day in range(len(met)):
+                streak = longest = 0
+                for value in met[max(day - window + 1, 0):day + 1]:
+                    streak = streak + 1 if value else 0
+                    longest = max(longest, streak)
+                expected.append(longest)
+            assert (output[f'longest_streak_{window}d'].values == expected).all()
+
+    # Eating windows: the end of one fast to the start of the next, by the day they start
+    output = quantify.rolling_adherence(discrete, windows=(1, 7))
+    assert output.eating_start_1d.tolist()[:2] == [pytest.approx(np.nan, nan_ok=True), 10 + 5 / 60]
+    assert output.eating_end_1d.tolist()[1] == 12.25
+    assert output.eating_start_7d.iloc[-1] == 10 + 5 / 60
+
+
+def test_rolling_longest_streak_range_max():
+    # Streaks use a range maximum on NumPy arrays, not a custom pandas rolling window (its signature varies by version)
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 100, size=50)
+    starts = rng.integers(0, 51, size=500)
+    ends = rng.integers(0, 51, size=500)
+    output = _intervals.range_max(values, starts, ends, empty=-1)
+    expected = [values[start:end].max() if end > start else -1 for start, end in zip(starts, ends)]
+    assert output.tolist() == expected
+    assert _intervals.range_max(values, np.array([0]), np.array([50])).tolist() == [values.max()]
+
+
+def test_repair_discrete_fasts(discrete, discrete_random):
+    messy = pd.DataFrame({'start_dt': pd.to_datetime(['1/1/21 20:00', '1/1/21 20:00', '1/2/21 06:00', '1/2/21 12:00',
+                                                      '1/3/21 20:00', None, '1/5/21 10:00', '1/2/21 18:00']),
+                          'end_dt': pd.to_datetime(['1/2/21 08:00', '1/2/21 08:00', '1/2/21 12:00', '1/2/21 14:00',
+                                                    '1/4/21 10:00', '1/4/21', '1/5/21 09:00', '1/3/21 08:00'])},
+                         index=list('abcdefgh'))
+    with pytest.raises(ValueError):
+        assert quantify.validate_discrete_fasts(messy)
+
+    repaired, report = quantify.repair_discrete_fasts(messy, policy='union')
+    assert quantify.validate_discrete_fasts(repaired)
+    assert repaired.start_dt.tolist() == pd.to_datetime(['1/1/21 20:00', '1/2/21 18:00', '1/3/21 20:00']).tolist()
+    assert repaired.end_dt.tolist() == pd.to_datetime(['1/2/21 14:00', '1/3/21 08:00', '1/4/21 10:00']).tolist()
+    assert report.row.tolist() == list('abcdfg')
+    assert report.action.tolist() == ['merged'] * 4 + ['dropped'] * 2
+    assert report.reason.tolist()[-2:] == ['missing', 'start after end']
+    assert report.fast.tolist() == [0, 0, 0, 0, -1, -1]
+
+    repaired, report = quantify.repair_discrete_fasts(messy, policy='first')
+    assert quantify.validate_discrete_fasts(repaired)
+    assert len(repaired) == 4  # Touching fasts are valid and kept
+    assert report.row.tolist() == list('bcfg')
+    assert report.reason.tolist()[:2] == ['duplicate', 'overlap']
+
+    repaired, report = quantify.repair_discrete_fasts(messy.iloc[:3], policy='longest')
+    assert repaired.end_dt.tolist() == [pd.Timestamp('1/2/21 08:00')]
+    assert report.row.tolist() == list('bc')
+
+    # Valid logs are unchanged, in any order
+    for fasts in [discrete, discrete_random]:
+        for policy in ['first', 'longest']:
+            repaired, report = quantify.repair_discrete_fasts(fasts.iloc[::-1], policy=policy)
+            assert repaired.equals(fasts) and report.empty
+        # The union merges back to back fasts, giving the same continuous log
+        repaired, _ = quantify.repair_discrete_fasts(fasts, policy='union')
+        assert quantify.continuous_fasts(repaired).equals(quantify.continuous_fasts(fasts))
+
+    with pytest.raises(ValueError):
+        assert quantify.repair_discrete_fasts(messy, policy='last')
+
+
+def test_rollup(discrete, continuous, discrete_random):
+    output = quantify.rollup(discrete_random, discrete=True)
+    assert list(output.granularity.unique()) == quantify.ROLLUP_GRANULARITIES
+
+    # Same as resampling the continuous log for each granularity
+    continuous_log = quantify.continuous_fasts(discrete_random)
+    cumulative = quantify.daily_cumulative_hours(continuous_log)
+    max_consecutive = quantify.daily_max_consecutive_hours(continuous_log)
+    days = output[output.granularity == 'day']
+    assert (days.start.values == cumulative.index.values).all()
+    assert np.allclose(days.fasting_hours, cumulative)
+    assert np.allclose(days.max_consecutive_hours, max_consecutive)
+
+    for granularity, rule in [('week', 'W-MON'), ('month', 'MS')]:
+        rolled = output[output.granularity == granularity].set_index('start')
+        expected = cumulative.resample(rule, closed='left', label='left')
+        assert np.allclose(rolled.fasting_hours, expected.sum())
+        assert np.allclose(rolled.average_daily_hours, expected.mean())
+        assert np.allclose(rolled.max_consecutive_hours, max_consecutive.resample(rule, closed='left',
+                                                                                  label='left').max())
+        assert (rolled.days.values == expected.size().values).all()
+
+    iso_weeks = output[output.granularity == 'iso_week']
+    assert iso_weeks.fasting_hours.tolist() == output[output.granularity == 'week'].fasting_hours.tolist()
+    weekdays = output[output.granularity == 'weekday'].set_index('period')
+    assert np.allclose(weekdays.loc[quantify.WEEKDAYS].fasting_hours,
+                       cumulative.groupby(cumulative.index.dayofweek).sum())
+    assert output.groupby('granularity').fasting_hours.sum().nunique() == 1  # Every granularity adds up the same
+
+    # Fasts: runs of fasting starting in each period
+    days = quantify.rollup(discrete, discrete=True, granularities=['day'])
+    assert days.fasts.tolist() == [1, 1, 0]
+    assert days.equals(quantify.rollup(continuous, granularities=['day']))
+    with pytest.raises(ValueError):
+        assert quantify.rollup(continuous, granularities=['year'])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.query` module."""
+
+import pytest
+from fasting import quantify
+from fasting.query import FastIndex
+import numpy as np
+import pandas as pd
+from tests.conftest import FAST_STARTS, FAST_ENDS, discrete_log
+
+
+@pytest.fixture(scope='session')
+def discrete():
+    # A third fast after a day without fasting
+    return discrete_log(FAST_STARTS + ['1/19/21 18:00:00'], FAST_ENDS + ['1/21/21 09:30:00'])
+
+
+@pytest.fixture(scope='session')
+def index(discrete):
+    return FastIndex(discrete.iloc[::-1])
+
+
+def test_is_fasting(discrete, index):
+    assert len(index) == 3
+    assert index.is_fasting('1/17/21 09:00')
+    assert index.is_fasting('1/17/21 10:05')  # End inclusive
+    assert not index.is_fasting('1/17/21 10:06')
+    assert index.fast_at('1/20/21') == 2
+
+    # Same fasting status as the continuous log
+    continuous_log = quantify.continuous_fasts(discrete)
+    assert (index.is_fasting(continuous_log.index) == continuous_log.values.astype(bool)).all()
+
+
+def test_fasting_minutes(discrete, index):
+    rng = np.random.default_rng(0)
+    first, last = discrete.start_dt.min().value, discrete.end_dt.max().value
+    begins = first + rng.integers(-10 ** 14, last - first, size=500)
+    ends = begins + rng.integers(-10 ** 13, 2 * 10 ** 14, size=500)
+    begins, ends = pd.DatetimeIndex(begins), pd.DatetimeIndex(ends)
+
+    # Brute force: clip every fast to every range
+    starts = discrete.start_dt.values[:, np.newaxis]
+    stops = discrete.end_dt.values[:, np.newaxis]
+    overlap = (np.minimum(stops, ends.values) - np.maximum(starts, begins.values)) / pd.Timedelta(minutes=1)
+    expected = np.maximum(overlap, 0).sum(axis=0) * (ends >= begins)
+    assert np.allclose(index.fasting_minutes(begins, ends), expected)
+
+    assert index.fasting_minutes('1/17/21 00:00', '1/18/21 00:00') == 10 * 60 + 5 + 11 * 60 + 45
+    assert index.fasting_minutes('1/1/21', '1/2/21') == 0
+
+
+def test_overlapping(discrete, index):
+    assert index.overlapping('1/17/21 09:00', '1/17/21 13:00').equals(discrete.iloc[0:2])
+    assert index.overlapping('1/17/21 10:05', '1/17/21 10:05').equals(discrete.iloc[0:1])  # Inclusive
+    assert index.overlapping('1/18/21 13:00', '1/19/21 17:00').empty
+    assert index.count_overlapping('1/16/21', '1/22/21') == 3
+    counts = index.count_overlapping(['1/16/21', '1/17/21 11:00', '1/21/21 09:31'],
+                                     ['1/17/21', '1/17/21 12:00', '1/22/21'])
+    assert counts.tolist() == [1, 0, 0]
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.storage` module."""
+
+import pytest
+from fasting import quantify
+from fasting import storage
+import numpy as np
+import pandas as pd
+
+
+def test_discrete_npy(discrete, tmpdir, monkeypatch, mocker):
+    path = str(tmpdir.join('discrete'))
+    storage.save_discrete(discrete, path)
+    assert storage.load_discrete(path).equals(discrete)
+    assert storage.load_discrete(path, mmap=False).equals(discrete)
+
+    with pytest.raises(ValueError):
+        assert storage.save_discrete(discrete, path, file_format='csv')
+
+    # A missing or misspelled directory is not read as Parquet
+    with pytest.raises(FileNotFoundError):
+        storage.load_discrete(str(tmpdir.join('discrete_typo')))
+
+    # Saving again replaces the log and its files, without a partial log on failure
+    storage.save_discrete(discrete.iloc[:1], path)
+    assert storage.load_discrete(path).equals(discrete.iloc[:1])
+    with monkeypatch.context() as patch:
+        patch.setattr(np, 'save', mocker.Mock(side_effect=OSError('disk full')))
+        with pytest.raises(OSError):
+            storage.save_discrete(discrete, path)
+    assert storage.load_discrete(path).equals(discrete.iloc[:1])
+    assert sorted(tmpdir.listdir()) == [tmpdir.join('discrete')]
+
+    # No stale files of the previous log are left behind
+    storage.save_continuous(quantify.continuous_fasts(discrete, compact=True), path)
+    assert not tmpdir.join('discrete', 'start.npy').exists()
+
+    # Directories that are not saved logs are not replaced
+    other = tmpdir.mkdir('other')
+    other.join('notes.txt').write('')
+    with pytest.raises(FileExistsError):
+        storage.save_discrete(discrete, str(other))
+
+
+def test_discrete_timezone(discrete, tmpdir):
+    path = str(tmpdir.join('discrete'))
+    aware = discrete.apply(lambda column: column.dt.tz_localize('US/Eastern'))
+    storage.save_discrete(aware, path)
+    assert storage.load_discrete(path).equals(aware)
+
+
+def test_discrete_parquet(discrete, tmpdir):
+    pytest.importorskip('pyarrow')
+    path = str(tmpdir.join('discrete.parquet'))
+    storage.save_discrete(discrete, path, file_format='parquet')
+    assert storage.load_discrete(path).equals(discrete)
+
+
+def test_continuous_mmap(discrete, tmpdir):
+    continuous_log = quantify.continuous_fasts(discrete)
+    path = str(tmpdir.join('continuous'))
+    storage.save_continuous(continuous_log, path)
+
+    output = storage.load_continuous(path)
+    assert output.equals(continuous_log)
+    assert output.index.equals(continuous_log.index)
+    assert isinstance(output.values, np.memmap)  # Zero copy
+    assert quantify.daily_cumulative_hours(output).equals(quantify.daily_cumulative_hours(continuous_log))
+
+    # A continuous log directory is not a discrete log
+    with pytest.raises(ValueError):
+        assert storage.load_discrete(path)
+
+
+def test_continuous_timezone(tmpdir):
+    # Time steps across the start of daylight saving time keep their timezone, not a fixed UTC offset
+    index = pd.date_range('2021-03-13 22:00', '2021-03-14 04:59', freq='1T', tz='America/New_York')
+    continuous_log = pd.Series(1, index=index)
+    path = str(tmpdir.join('continuous'))
+    storage.save_continuous(continuous_log, path)
+
+    output = storage.load_continuous(path)
+    assert output.index.equals(continuous_log.index)
+    assert str(output.index.tz) == 'America/New_York'
+    assert output.index.tz_localize(None).equals(continuous_log.index.tz_localize(None))  # Same wall clock times
+
+
+def test_continuous_timeline(discrete, tmpdir):
+    timeline = quantify.continuous_fasts(discrete, compact=True)
+    path = str(tmpdir.join('timeline'))
+    storage.save_continuous(timeline, path)
+    assert storage.load_continuous(path) == timeline
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.synthetic` module."""
+
+from fasting import quantify
+from fasting import synthetic
+import numpy as np
+import pandas as pd
+
+
+def test_discrete_log():
+    fasts = synthetic.discrete_log(years=2, start='1/1/21 20:00', seed=0)
+    assert quantify.validate_discrete_fasts(fasts)
+    assert fasts.start_dt.iloc[0] == pd.Timestamp('1/1/21 20:00')
+    assert fasts.end_dt.iloc[-1] <= pd.Timestamp('1/1/21 20:00') + pd.Timedelta(days=2 * 365.25)
+    assert fasts.end_dt.iloc[-1] >= pd.Timestamp('1/1/23')
+    assert synthetic.discrete_log(years=2, start='1/1/21 20:00', seed=0).equals(fasts)  # Reproducible
+
+    hours = (fasts.end_dt - fasts.start_dt) / pd.Timedelta(hours=1)
+    assert abs(hours.mean() - 16) < 0.5
+
+    # Any distribution of fast lengths
+    omad = synthetic.discrete_log(years=1, fast_hours=lambda rng, size: rng.uniform(22, 24, size=size), seed=0)
+    hours = (omad.end_dt - omad.start_dt) / pd.Timedelta(hours=1)
+    assert hours.between(22, 24).all()
+
+
+def test_cohort_exports(tmpdir):
+    exports = synthetic.cohort_exports(str(tmpdir), users=3, years=1, seed=0,
+                                       fast_hours=synthetic.FAST_SCHEDULES['one meal a day'])
+    assert list(exports) == ['user_00000', 'user_00001', 'user_00002']
+
+    # Exports load back to the discrete logs they were written from
+    for user_seed, path in zip(np.random.SeedSequence(0).spawn(3), exports.values()):
+        fasts = synthetic.discrete_log(years=1, seed=user_seed, fast_hours=synthetic.FAST_SCHEDULES['one meal a day'])
+        assert quantify.zero_fasts(path).equals(fasts)
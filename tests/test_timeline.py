@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""Tests for `fasting.timeline` module."""
+
+import pytest
+from fasting import quantify
+from fasting.timeline import FastingTimeline
+import numpy as np
+import pandas as pd
+from tests.conftest import FAST_STARTS, FAST_ENDS, discrete_log
+
+
+@pytest.fixture(scope='session')
+def discrete():
+    # A third fast after a day without fasting
+    return discrete_log(FAST_STARTS + ['1/19/21 18:00:00'], FAST_ENDS + ['1/21/21 09:30:00'])
+
+
+@pytest.fixture(scope='session')
+def continuous(discrete):
+    return quantify.continuous_fasts(discrete)
+
+
+def test_from_series(continuous):
+    timeline = FastingTimeline.from_series(continuous)
+    assert len(timeline) == len(continuous)
+    assert timeline.to_series().equals(continuous)
+    assert timeline.nbytes < continuous.memory_usage(index=False)
+
+    # Negative test: values other than 0 or 1
+    wrong_values = continuous.copy()
+    wrong_values[:] = 2
+    with pytest.raises(ValueError):
+        assert FastingTimeline.from_series(wrong_values)
+
+
+def test_from_discrete(discrete, continuous):
+    timeline = FastingTimeline.from_discrete(discrete)
+    assert timeline == FastingTimeline.from_series(continuous)
+    assert quantify.continuous_fasts(discrete, compact=True) == timeline
+
+
+def test_packed(continuous):
+    timeline = FastingTimeline.from_series(continuous)
+    bits = timeline.to_packed()
+    assert bits.dtype == np.uint8
+    assert len(bits) == -(-len(continuous) // 8)
+    assert FastingTimeline.from_packed(bits, timeline.start, timeline.periods) == timeline
+
+
+def test_slicing(continuous):
+    timeline = FastingTimeline.from_series(continuous)
+
+    # Label slicing includes the stop timestamp
+    start = pd.Timestamp('1/17/21 09:00:30')
+    stop = pd.Timestamp('1/19/21 18:10:00')
+    assert timeline[start:stop].to_series().equals(continuous[start:stop])
+    assert timeline[:stop].to_series().equals(continuous[:stop])
+    assert timeline[start:].to_series().equals(continuous[start:])
+
+    # Positional slicing excludes the stop position
+    assert timeline[10:2000].to_series().equals(continuous[10:2000])
+
+    with pytest.raises(TypeError):
+        assert timeline[::2]
+
+
+def test_quantify_accepts_timeline(continuous):
+    timeline = FastingTimeline.from_series(continuous)
+    assert quantify.validate_continuous_fasts(timeline)
+    assert quantify.consecutive_minutes(timeline).equals(quantify.consecutive_minutes(continuous))
+    assert quantify.daily_cumulative_hours(timeline).equals(quantify.daily_cumulative_hours(continuous))
+    assert quantify.daily_max_consecutive_hours(timeline).equals(quantify.daily_max_consecutive_hours(continuous))